@@ -15,17 +15,26 @@ logger = logging.getLogger("stock_zero")
 DEBUG = False
 
 
-def _qp_get(key: str, default: str = "") -> str:
+def _qp_snapshot() -> dict[str, str]:
+    # Lectura unica de query params por rerun; valores lista -> escalar una sola vez.
     try:
-        qp = st.query_params  # Streamlit moderno
-        v = qp.get(key, default)
-        if isinstance(v, list):
-            return v[0] if v else default
-        return v if v is not None else default
+        raw = dict(st.query_params)  # Streamlit moderno
     except Exception:
-        qp = st.experimental_get_query_params()
-        v = qp.get(key, [default])
-        return v[0] if isinstance(v, list) and v else default
+        raw = st.experimental_get_query_params()
+    out: dict[str, str] = {}
+    for k, v in raw.items():
+        if isinstance(v, list):
+            v = v[0] if v else None
+        if v is not None:
+            out[str(k)] = str(v)
+    return out
+
+
+def _qp_get(key: str, default: str = "") -> str:
+    qp = st.session_state.get("_qp_snapshot")
+    if qp is None:
+        qp = _qp_snapshot()
+    return qp.get(key, default)
 
 
 def _as_bool(s: str) -> bool:
@@ -61,21 +70,30 @@ def _ensure_run_context() -> None:
     st.session_state["_run_path"] = "cold" if seq == 1 else "warm"
 
 
+class _DbgPayload(dict):
+    # Se formatea como "k=v ..." recién cuando un handler emite el registro (arg perezoso).
+    def __str__(self) -> str:
+        return " ".join(f"{k}={v}" for k, v in self.items())
+
+
 def _dbg(msg: str, tag: str = "UI", **kv) -> None:
     global DEBUG
+    # db.py deja "stock_zero" en INFO: fuera de DEBUG sólo se trabaja si alguien pidió nivel DEBUG.
+    if not DEBUG and not logger.isEnabledFor(logging.DEBUG):
+        return
     ts = datetime.now(timezone.utc).strftime("%H:%M:%S.%f")[:-3]
-    ctx = {
-        "run_id": st.session_state.get("_run_id", "-"),
-        "env": st.session_state.get("_runtime_env", "-"),
-        "path": st.session_state.get("_run_path", "-"),
-        "mode": st.session_state.get("home_mode", "-"),
-    }
-    payload = {**ctx, **kv}
-    extra = " ".join([f"{k}={v}" for k, v in payload.items()]) if payload else ""
-    line = f"{ts} | {tag} | {msg}" + (f" | {extra}" if extra else "")
+    payload = _DbgPayload(
+        {
+            "run_id": st.session_state.get("_run_id", "-"),
+            "env": st.session_state.get("_runtime_env", "-"),
+            "path": st.session_state.get("_run_path", "-"),
+            "mode": st.session_state.get("home_mode", "-"),
+        },
+        **kv,
+    )
 
     try:
-        logger.info("DBG %s", line)
+        logger.log(logging.INFO if DEBUG else logging.DEBUG, "DBG %s | %s | %s | %s", ts, tag, msg, payload)
     except Exception:
         pass
 
@@ -83,7 +101,7 @@ def _dbg(msg: str, tag: str = "UI", **kv) -> None:
         return
 
     st.session_state.setdefault("_dbg_lines", [])
-    st.session_state["_dbg_lines"].append(line)
+    st.session_state["_dbg_lines"].append(f"{ts} | {tag} | {msg} | {payload}")
 
     if len(st.session_state["_dbg_lines"]) > 250:
         st.session_state["_dbg_lines"] = st.session_state["_dbg_lines"][-250:]
@@ -91,9 +109,17 @@ def _dbg(msg: str, tag: str = "UI", **kv) -> None:
     st.session_state["_dbg_last"] = f"{tag} | {msg}"
 
 def _dbg_block() -> None:
+    # Solo marca; el sidebar se dibuja una vez por rerun en _dbg_flush().
     global DEBUG
     if not DEBUG:
         return
+    st.session_state["_dbg_dirty"] = True
+
+
+def _dbg_flush() -> None:
+    global DEBUG
+    if not DEBUG or not st.session_state.pop("_dbg_dirty", False):
+        return
     st.sidebar.markdown("### 🛠 DEBUG")
     st.sidebar.caption(f"Último paso: {st.session_state.get('_dbg_last', '-')}")
     with st.sidebar.expander("Trace (últimos 250)", expanded=False):
@@ -260,6 +286,7 @@ def main():
     from app.screens.control_gestion import render_control_gestion
     from app.screens.reposicion import render_reposicion
 
+    st.session_state["_qp_snapshot"] = _qp_snapshot()
     DEBUG = _as_bool(_qp_get("debug", "")) or _as_bool(os.getenv("DEBUG_UI", ""))
     _ensure_run_context()
     _dbg("BOOT Home.py", py=str(getattr(__import__("sys"), "version", "na")).split()[0], run_seq=st.session_state.get("_run_seq"))
@@ -299,6 +326,8 @@ def main():
         st.session_state.pop("_kpis_row", None)
         st.session_state.pop("_total_key", None)
         st.session_state.pop("_total_rows", None)
+        st.session_state.pop("_page_df_key", None)
+        st.session_state.pop("_page_df", None)
 
         st.session_state.pop("_export_key", None)
         st.session_state.pop("_export_df_key", None)
@@ -490,4 +519,7 @@ def main():
             _rename_and_pick=_rename_and_pick,
         )
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        _dbg_flush()
@@ -1,25 +1,37 @@
 # app/db.py
 from __future__ import annotations
 
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 import os
+import re
 import json
 import time
+import select
 import hashlib
 import logging
-from typing import Any
+import threading
+from typing import Any, Callable, TypeVar
 
 import pandas as pd
 import streamlit as st
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, text
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError
+from sqlalchemy.sql.elements import TextClause
 
 try:
     import psycopg2  # type: ignore
 except Exception:
     psycopg2 = None  # noqa
 
+try:
+    import connectorx as cx  # type: ignore
+except Exception:
+    cx = None  # noqa
+
 logger = logging.getLogger("stock_zero")
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)s | %(message)s")
@@ -29,9 +41,23 @@ ENV_PATH = ROOT / ".env"
 load_dotenv(dotenv_path=ENV_PATH, override=True)
 
 DV_TTL = int(os.getenv("DV_TTL", "60"))
+# LISTEN/NOTIFY: el loader avisa tras cargar y se invalida data_version al instante.
+# Con DV_LISTEN=1 se pueden subir DV_TTL/QDF_TTL sin servir datos viejos.
+DV_LISTEN = os.getenv("DV_LISTEN", "0").strip().lower() in {"1", "true", "yes", "si"}
+DV_CHANNEL = os.getenv("DATA_VERSION_CHANNEL", "stock_zero_data_version").strip()
+DV_LISTEN_RETRY_S = int(os.getenv("DV_LISTEN_RETRY_S", "30"))
 QDF_TTL = int(os.getenv("QDF_TTL", "180"))
+# LRU en memoria del proceso delante de _qdf_cached: un hit no paga el unpickle de st.cache_data.
+QDF_LOCAL_CACHE_SIZE = int(os.getenv("QDF_LOCAL_CACHE_SIZE", "128"))
+# Tope en MB (memory_usage superficial) para el LRU; los qdf(stream=True) de exports no entran.
+QDF_LOCAL_CACHE_MB = int(os.getenv("QDF_LOCAL_CACHE_MB", "256"))
+# Exports: cursor del lado del servidor, leído en bloques de N filas (sin fetchall completo).
+EXPORT_STREAM_BATCH = int(os.getenv("EXPORT_STREAM_BATCH", "2000"))
 MAX_MARCA_FILTER = int(os.getenv("MAX_MARCA_FILTER", "50"))
-ACTIVE_DB_URL_TTL = int(os.getenv("ACTIVE_DB_URL_TTL", "300"))
+# Failover perezoso: sin probe periódico; si el primary falla al conectar/desconecta, se marca
+# caído por este tiempo y get_engine() entrega el engine de DB_URL_FALLBACK. El statement que
+# encontró el primary caído se reintenta una vez en el fallback (el usuario no ve el error).
+DB_FAILOVER_COOLDOWN_S = int(os.getenv("DB_FAILOVER_COOLDOWN_S", "60"))
 
 RUTA_TABLE = os.getenv("RUTA_TABLE", "public.ruta_rutero")
 
@@ -41,6 +67,13 @@ RESULT_VIEW = os.getenv("RESULT_VIEW_STOCK_UX", "public.v_stock_local_cliente_ux
 RESULT_VIEW_ROLE = os.getenv("RESULT_VIEW_ROLE", "bridge_transition")
 
 SELECTOR_TTL = int(os.getenv("SELECTOR_TTL", "600"))
+SQL_TEXT_CACHE_SIZE = int(os.getenv("SQL_TEXT_CACHE_SIZE", "512"))
+# "psycopg": el engine usa psycopg 3 (protocolo extendido, prepara en el servidor los SQL que se
+# repiten PG_PREPARE_THRESHOLD veces por conexión). No usar detrás de un pooler en modo
+# transacción (p.ej. puerto 6543 de Supabase): los prepared statements no sobreviven.
+DB_DRIVER = os.getenv("DB_DRIVER", "psycopg2").strip().lower()
+# "connectorx": lecturas qdf via COPY binario -> Arrow (requiere connectorx + pyarrow); fallback a read_sql.
+QDF_BACKEND = os.getenv("QDF_BACKEND", "sqlalchemy").strip().lower()
 
 LOCALES_HOME_VIEW = os.getenv("LOCALES_HOME_VIEW", "public.v_locales_home")
 SELECTOR_MODALIDAD_VIEW = os.getenv("SELECTOR_MODALIDAD_VIEW", "public.v_selector_modalidad")
@@ -155,40 +188,6 @@ def get_result_view_contract() -> dict[str, str]:
     }
 
 
-@st.cache_data(ttl=ACTIVE_DB_URL_TTL, show_spinner=False)
-def _get_active_db_url_cached() -> str:
-    cache_sig = _sig("active_db_url")
-    _set_mark("INFRA", "active_db_url", cache_sig)
-
-    t0 = time.perf_counter()
-    primary, fallback = _get_db_urls()
-    selected = "none"
-
-    if primary and _probe_pg(primary, target="primary"):
-        selected = "primary"
-        out = primary
-    elif fallback and _probe_pg(fallback, target="fallback"):
-        logger.warning("Usando DB_URL_FALLBACK (primary no responde).")
-        selected = "fallback"
-        out = fallback
-    else:
-        out = primary or (fallback or "")
-        if primary:
-            selected = "primary_unchecked"
-        elif fallback:
-            selected = "fallback_unchecked"
-
-    _trace(
-        "INFRA",
-        "active_db_url_exec",
-        active_db_url_ms=_fmt_ms(time.perf_counter() - t0),
-        selected=selected,
-        fallback_present=bool(fallback),
-        ttl=ACTIVE_DB_URL_TTL,
-    )
-    return out
-
-
 class AppError(RuntimeError):
     pass
 
@@ -293,48 +292,59 @@ def _get_db_urls() -> tuple[str, str | None]:
     return primary, fallback
 
 
-def _probe_pg(url: str, target: str = "primary") -> bool:
-    t0 = time.perf_counter()
-    if psycopg2 is None:
-        _trace(
-            "INFRA",
-            "probe_pg",
-            target=target,
-            probe_pg_ms=_fmt_ms(time.perf_counter() - t0),
-            ok=True,
-            driver="psycopg2_missing",
-        )
-        return True
+# Estado de salud del primary, por proceso (lo comparten todas las sesiones del worker).
+# primary_down_until = 0.0 -> primary sano; down_epoch sube cada vez que se marca caído.
+_DB_HEALTH: dict[str, Any] = {"primary_down_until": 0.0, "probing": False, "down_epoch": 0}
+_DB_HEALTH_LOCK = threading.Lock()
 
-    timeout = int(os.getenv("CONNECT_TIMEOUT", "3"))
+
+def _mark_primary_down(err: str) -> None:
+    _DB_HEALTH["primary_down_until"] = time.monotonic() + DB_FAILOVER_COOLDOWN_S
+    _DB_HEALTH["down_epoch"] += 1
+    logger.warning("Usando DB_URL_FALLBACK (primary no responde: %s).", err)
+    _trace("INFRA", "primary_down", err=err, cooldown_s=DB_FAILOVER_COOLDOWN_S)
+
+
+def _probe_primary(url: str) -> None:
+    # Corre en segundo plano mientras las sesiones siguen en el fallback: el connect_timeout de
+    # un primary todavía caído no lo paga ningún request.
+    t0 = time.perf_counter()
     try:
-        with psycopg2.connect(url, connect_timeout=timeout) as conn:
-            with conn.cursor() as cur:
-                cur.execute("SELECT 1;")
-        ok = True
+        psycopg2.connect(url, connect_timeout=int(os.getenv("CONNECT_TIMEOUT", "3"))).close()
+        _DB_HEALTH["primary_down_until"] = 0.0
+        _trace("INFRA", "primary_probe", ok=True, probe_ms=_fmt_ms(time.perf_counter() - t0))
     except Exception as e:
-        ok = False
-        _trace(
-            "INFRA",
-            "probe_pg_err",
-            target=target,
-            probe_pg_ms=_fmt_ms(time.perf_counter() - t0),
-            ok=ok,
-            err=type(e).__name__,
-        )
-        return ok
+        _mark_primary_down(type(e).__name__)
+    finally:
+        _DB_HEALTH["probing"] = False
 
-    _trace("INFRA", "probe_pg", target=target, probe_pg_ms=_fmt_ms(time.perf_counter() - t0), ok=ok)
-    return ok
+
+def _primary_available(primary: str) -> bool:
+    down_until = _DB_HEALTH["primary_down_until"]
+    if not down_until:
+        return True
+    if time.monotonic() < down_until:
+        return False
+    if psycopg2 is None:
+        # Sin driver para sondear: vuelve al primary y el próximo error decide.
+        _DB_HEALTH["primary_down_until"] = 0.0
+        return True
+    with _DB_HEALTH_LOCK:
+        if not _DB_HEALTH["probing"]:
+            _DB_HEALTH["probing"] = True
+            threading.Thread(target=_probe_primary, args=(primary,), name="stock_zero_primary_probe", daemon=True).start()
+    return False
 
 
 def get_active_db_url() -> str:
-    cache_sig = _sig("active_db_url")
-    before = _get_mark("INFRA", "active_db_url", cache_sig)
-    t0 = time.perf_counter()
-    out = _get_active_db_url_cached()
-    cache_state = "miss" if _get_mark("INFRA", "active_db_url", cache_sig) != before else "hit"
-    _trace("INFRA", "get_active_db_url", active_db_url_ms=_fmt_ms(time.perf_counter() - t0), cache_state=cache_state)
+    # Sin conexión de prueba en el request: primary salvo que un error real de conexión lo haya
+    # marcado caído; vencido el cooldown, un hilo lo re-sondea y se vuelve sólo si responde.
+    primary, fallback = _get_db_urls()
+    if primary and (not fallback or _primary_available(primary)):
+        selected, out = "primary", primary
+    else:
+        selected, out = "fallback", fallback or primary
+    _trace("INFRA", "get_active_db_url", selected=selected, fallback_present=bool(fallback))
     return out
 
 
@@ -348,6 +358,13 @@ def _engine_cached(db_url: str) -> Engine:
     max_overflow = int(os.getenv("MAX_OVERFLOW", "30"))
     pool_timeout = int(os.getenv("POOL_TIMEOUT", "30"))
     pool_recycle = int(os.getenv("POOL_RECYCLE", "1800"))
+    # LIFO: se reusa la conexión más reciente (backend con catálogo/planes en caliente); las
+    # que sobran quedan ociosas hasta que pool_recycle las cierra.
+    pool_use_lifo = os.getenv("POOL_USE_LIFO", "1").strip().lower() in {"1", "true", "yes", "si"}
+    # Pre-ping sólo para conexiones ociosas más de N s; <= 0 vuelve al pre-ping en cada checkout.
+    pre_ping_idle_s = int(os.getenv("POOL_PRE_PING_IDLE_S", "60"))
+
+    query_cache_size = int(os.getenv("QUERY_CACHE_SIZE", "1200"))
 
     connect_timeout = int(os.getenv("CONNECT_TIMEOUT", "3"))
     stmt_timeout_ms = int(os.getenv("STATEMENT_TIMEOUT_MS", "15000"))
@@ -356,16 +373,65 @@ def _engine_cached(db_url: str) -> Engine:
     if stmt_timeout_ms > 0:
         connect_args["options"] = f"-c statement_timeout={stmt_timeout_ms}"
 
+    # db_url queda intacta (LISTEN y connectorx la usan con sus propios drivers); sólo el
+    # engine cambia de dialecto.
+    engine_url = make_url(db_url)
+    driver = "default"
+    if DB_DRIVER == "psycopg" and engine_url.get_backend_name() == "postgresql":
+        engine_url = engine_url.set(drivername="postgresql+psycopg")
+        connect_args["prepare_threshold"] = int(os.getenv("PG_PREPARE_THRESHOLD", "5"))
+        driver = "psycopg"
+
     eng = create_engine(
-        db_url,
+        engine_url,
         pool_size=pool_size,
         max_overflow=max_overflow,
         pool_timeout=pool_timeout,
         pool_recycle=pool_recycle,
-        pool_pre_ping=True,
+        pool_pre_ping=pre_ping_idle_s <= 0,
+        pool_use_lifo=pool_use_lifo,
+        query_cache_size=query_cache_size,
         future=True,
         connect_args=connect_args,
     )
+
+    if pre_ping_idle_s > 0:
+        @event.listens_for(eng, "checkin")
+        def _on_checkin(dbapi_conn, record) -> None:
+            record.info["last_used"] = time.monotonic()
+
+        @event.listens_for(eng, "checkout")
+        def _on_checkout(dbapi_conn, record, proxy) -> None:
+            # Conexión recién abierta o usada hace poco: sin round-trip extra. Si el ping falla,
+            # DisconnectionError hace que el pool descarte esta conexión y abra otra.
+            last_used = record.info.get("last_used")
+            if last_used is None or time.monotonic() - last_used <= pre_ping_idle_s:
+                return
+            try:
+                cur = dbapi_conn.cursor()
+                try:
+                    cur.execute("SELECT 1")
+                finally:
+                    cur.close()
+            except Exception as e:
+                raise DisconnectionError(type(e).__name__) from e
+
+    primary, fallback = _get_db_urls()
+    if fallback and db_url == primary:
+        @event.listens_for(eng, "handle_error")
+        def _on_primary_error(ctx) -> None:
+            # Desconexión o fallo al conectar (OperationalError sin SQLSTATE del servidor);
+            # un statement_timeout u otro error de query trae pgcode y no dispara failover.
+            # El pool ya invalida la conexión rota; aquí sólo se desvía el próximo get_engine().
+            if ctx.is_disconnect or (
+                isinstance(ctx.sqlalchemy_exception, OperationalError)
+                and not (
+                    getattr(ctx.original_exception, "pgcode", None)
+                    or getattr(ctx.original_exception, "sqlstate", None)
+                )
+            ):
+                _mark_primary_down(type(ctx.original_exception).__name__)
+
     _trace(
         "INFRA",
         "engine_exec",
@@ -374,13 +440,76 @@ def _engine_cached(db_url: str) -> Engine:
         max_overflow=max_overflow,
         pool_timeout=pool_timeout,
         pool_recycle=pool_recycle,
+        driver=driver,
+        pool_use_lifo=pool_use_lifo,
+        pre_ping_idle_s=pre_ping_idle_s,
+        query_cache_size=query_cache_size,
         stmt_timeout_ms=stmt_timeout_ms,
     )
     return eng
 
 
+def _invalidate_data_version(payload: str) -> None:
+    # Sólo caches de metadata/selectores: qdf va keyed por data_version y se renueva solo.
+    for fn in (
+        _meta_snapshot_cached,
+        _get_data_version_cached,
+        _get_data_version_info_cached,
+        _selector_df_cached,
+        _selector_values_cached,
+    ):
+        fn.clear()
+    logger.info("TRACE DV | data_version_notify | payload=%s", payload)
+
+
+def _listen_data_version(db_url: str, stop: threading.Event) -> None:
+    timeout = int(os.getenv("CONNECT_TIMEOUT", "3"))
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(db_url, connect_timeout=timeout)
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {DV_CHANNEL};")
+            while not stop.is_set():
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                if conn.notifies:
+                    payload = conn.notifies[-1].payload
+                    conn.notifies.clear()
+                    _invalidate_data_version(payload)
+        except Exception as e:
+            logger.warning("TRACE DV | data_version_listen_err | err=%s", type(e).__name__)
+            stop.wait(DV_LISTEN_RETRY_S)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+@st.cache_resource(show_spinner=False)
+def _data_version_listener(db_url: str) -> threading.Event | None:
+    # Un hilo daemon por proceso/URL; el Event permite detenerlo si el recurso se limpia.
+    if psycopg2 is None or not re.fullmatch(r"[a-z_][a-z0-9_]*", DV_CHANNEL):
+        logger.warning("TRACE DV | data_version_listen_off | channel=%s", DV_CHANNEL)
+        return None
+    stop = threading.Event()
+    threading.Thread(
+        target=_listen_data_version,
+        args=(db_url, stop),
+        name="stock_zero_dv_listen",
+        daemon=True,
+    ).start()
+    return stop
+
+
 def get_engine() -> Engine:
     db_url = get_active_db_url()
+    if DV_LISTEN:
+        _data_version_listener(db_url)
     cache_sig = _sig(db_url)
     before = _get_mark("INFRA", "engine", cache_sig)
     t0 = time.perf_counter()
@@ -390,13 +519,89 @@ def get_engine() -> Engine:
     return eng
 
 
+_T = TypeVar("_T")
+
+
+def _run_with_failover(run: Callable[[Engine], _T]) -> _T:
+    # Si durante este statement _on_primary_error marcó el primary caído, se repite una vez en el
+    # engine del fallback. Errores de query (o ya estando en el fallback) se propagan tal cual.
+    epoch = _DB_HEALTH["down_epoch"]
+    eng = get_engine()
+    try:
+        return run(eng)
+    except DBAPIError as e:
+        primary, fallback = _get_db_urls()
+        if not fallback or fallback == primary or _DB_HEALTH["down_epoch"] == epoch:
+            raise
+        fallback_eng = _engine_cached(fallback)
+        if fallback_eng is eng:
+            raise
+        _trace("INFRA", "failover_retry", err=type(e.orig).__name__ if e.orig is not None else type(e).__name__)
+        return run(fallback_eng)
+
+
+@lru_cache(maxsize=SQL_TEXT_CACHE_SIZE)
+def _sql_text(sql: str) -> TextClause:
+    # text() parsea los :binds con regex en cada llamada; el mismo SQL reusa el
+    # TextClause y con él la entrada del compiled cache del engine.
+    return text(sql)
+
+
+META_SNAPSHOT_SQL = """
+    SELECT
+      (SELECT MAX(ingested_at) FROM public.fact_stock_venta) AS fact_ingested_at,
+      dv.fecha_datos,
+      dv.ingested_at
+    FROM (SELECT 1) AS one
+    LEFT JOIN LATERAL (
+      SELECT fecha_datos, ingested_at FROM public.v_data_version LIMIT 1
+    ) dv ON TRUE;
+"""
+
+
+@st.cache_data(ttl=DV_TTL, show_spinner=False)
+def _meta_snapshot_cached() -> tuple[Any, Any, Any] | None:
+    # Un solo viaje para data_version + data_version_info; tupla cruda, sin DataFrame.
+    # None si falla (p.ej. falta v_data_version): cada consumidor cae a sus candidatos de siempre.
+    _set_mark("DV", "meta_snapshot", _sig("meta_snapshot"))
+    t0 = time.perf_counter()
+
+    def _run(eng: Engine) -> Any:
+        with eng.connect() as conn:
+            return conn.execute(_sql_text(META_SNAPSHOT_SQL)).fetchone()
+
+    try:
+        # Primera query de cada request (vía data_version): también reintenta en el fallback.
+        row = _run_with_failover(_run)
+    except Exception as e:
+        _trace("DV", "meta_snapshot_err", meta_ms=_fmt_ms(time.perf_counter() - t0), err=type(e).__name__)
+        return None
+    _trace("DV", "meta_snapshot_exec", meta_ms=_fmt_ms(time.perf_counter() - t0), found=row is not None)
+    return tuple(row) if row is not None else None
+
+
+def _meta_snapshot() -> tuple[Any, Any, Any] | None:
+    cache_sig = _sig("meta_snapshot")
+    before = _get_mark("DV", "meta_snapshot", cache_sig)
+    t0 = time.perf_counter()
+    out = _meta_snapshot_cached()
+    cache_state = "miss" if _get_mark("DV", "meta_snapshot", cache_sig) != before else "hit"
+    _trace("DV", "meta_snapshot", meta_ms=_fmt_ms(time.perf_counter() - t0), cache_state=cache_state)
+    return out
+
+
 @st.cache_data(ttl=DV_TTL, show_spinner=False)
 def _get_data_version_info_cached() -> dict[str, Any]:
     cache_sig = _sig("data_version_info")
     _set_mark("DV", "data_version_info", cache_sig)
 
-    eng = get_engine()
     total_t0 = time.perf_counter()
+    snap = _meta_snapshot()
+    if snap is not None and (snap[1] is not None or snap[2] is not None):
+        _trace("DV", "get_data_version_info_exec", data_version_ms=_fmt_ms(time.perf_counter() - total_t0), source="meta_snapshot")
+        return {"fecha_datos": snap[1], "ingested_at": snap[2]}
+
+    eng = get_engine()
     with eng.connect() as conn:
         try:
             t_sql = time.perf_counter()
@@ -445,18 +650,24 @@ def _get_data_version_cached() -> str:
     cache_sig = _sig("data_version")
     _set_mark("DV", "data_version", cache_sig)
 
+    total_t0 = time.perf_counter()
+    snap = _meta_snapshot()
+    if snap is not None and snap[0] is not None:
+        out = str(snap[0])
+        _trace("DV", "get_data_version_exec", data_version_ms=_fmt_ms(time.perf_counter() - total_t0), source="meta_snapshot", dv=out)
+        return out
+
     eng = get_engine()
     candidates = [
         ("public.fact_stock_venta.ingested_at", "SELECT MAX(ingested_at) AS dv FROM public.fact_stock_venta;"),
         (RESULT_VIEW, f"SELECT MAX(fecha) AS dv FROM {RESULT_VIEW};"),
         ("public.v_data_version", "SELECT MAX(fecha_datos) AS dv FROM public.v_data_version;"),
     ]
-    total_t0 = time.perf_counter()
     with eng.connect() as conn:
         for source, sql in candidates:
             try:
                 t_sql = time.perf_counter()
-                df = pd.read_sql(text(sql), conn)
+                df = pd.read_sql(_sql_text(sql), conn)
                 read_sql_ms = _fmt_ms(time.perf_counter() - t_sql)
                 dv = df.iloc[0]["dv"]
                 _trace("DV", "data_version_candidate", source=source, read_sql_ms=read_sql_ms, dv_found=dv is not None)
@@ -487,17 +698,88 @@ def get_data_version() -> str:
     return out
 
 
+def _read_sql_connectorx(eng: Engine, conn, sql: str, params: dict[str, Any] | None) -> pd.DataFrame:
+    # connectorx no acepta binds: se interpolan con mogrify de psycopg2, el mismo escapado que usa execute().
+    # to_pandas() sin ArrowDtype para conservar los dtypes que el resto de la app espera de read_sql.
+    compiled = _sql_text(sql).compile(dialect=conn.dialect)
+    cur = conn.connection.cursor()
+    try:
+        bound_sql = cur.mogrify(str(compiled), compiled.construct_params(params or {})).decode("utf-8")
+    finally:
+        cur.close()
+    cx_url = eng.url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return cx.read_sql(cx_url, bound_sql, return_type="arrow").to_pandas()
+
+
+def _concat_chunks_by_column(chunks) -> pd.DataFrame | None:
+    # pd.concat(list(chunks)) deja convivir todos los bloques con el frame final (~2x). Columna a
+    # columna, cada concat suelta su lista de partes antes de la siguiente: el pico queda cerca de 1x
+    # más una columna. Por posición (no por nombre) para tolerar columnas repetidas.
+    columns = None
+    parts: list[list[pd.Series] | None] = []
+    for chunk in chunks:
+        if columns is None:
+            columns = chunk.columns
+            parts = [[] for _ in columns]
+        for i in range(chunk.shape[1]):
+            parts[i].append(chunk.iloc[:, i])
+    if columns is None:
+        return None
+    out = []
+    for i in range(len(parts)):
+        col_parts, parts[i] = parts[i], None
+        out.append(pd.concat(col_parts, ignore_index=True))
+        del col_parts
+    df = pd.DataFrame(dict(enumerate(out)), copy=False)
+    df.columns = columns
+    return df
+
+
+def _canon_params(params: dict[str, Any] | None) -> dict[str, Any] | None:
+    # st.cache_data hashea el dict en orden de inserción: mismas claves en otro orden (o {} vs
+    # None) serían entradas distintas. Claves ordenadas y vacío -> None antes de llegar al cache.
+    if not params:
+        return None
+    return {k: params[k] for k in sorted(params)}
+
+
 @st.cache_data(ttl=QDF_TTL, show_spinner=False)
-def _qdf_cached(data_version: str, sql: str, params: dict[str, Any] | None) -> pd.DataFrame:
+def _qdf_cached(
+    data_version: str,
+    sql: str,
+    params: dict[str, Any] | None,
+    stream: bool = False,
+) -> pd.DataFrame:
     cache_sig = _sig(data_version, sql, params or {})
     _set_mark("QUERY", "qdf", cache_sig)
 
-    eng = get_engine()
     total_t0 = time.perf_counter()
-    with eng.connect() as conn:
-        t_sql = time.perf_counter()
-        df = pd.read_sql(text(sql), conn, params=params)
-        read_sql_ms = _fmt_ms(time.perf_counter() - t_sql)
+
+    def _run(eng: Engine) -> tuple[pd.DataFrame, str, str]:
+        backend = "sqlalchemy"
+        with eng.connect() as conn:
+            t_sql = time.perf_counter()
+            df = None
+            if QDF_BACKEND == "connectorx" and cx is not None:
+                try:
+                    df = _read_sql_connectorx(eng, conn, sql, params)
+                    backend = "connectorx"
+                except Exception as e:
+                    _trace("QUERY", "qdf_connectorx_fallback", sql_sig=_sig(sql), err=type(e).__name__)
+                    df = None
+            if df is None and stream:
+                # stream_results = cursor con nombre en psycopg2: sólo un bloque de filas crudas a la vez
+                # en el cliente. Los bloques se arman columna a columna (_concat_chunks_by_column).
+                stream_conn = conn.execution_options(stream_results=True, max_row_buffer=EXPORT_STREAM_BATCH)
+                df = _concat_chunks_by_column(
+                    pd.read_sql(_sql_text(sql), stream_conn, params=params, chunksize=EXPORT_STREAM_BATCH)
+                )
+                backend = "server_cursor"
+            if df is None:
+                df = pd.read_sql(_sql_text(sql), conn, params=params)
+            return df, backend, _fmt_ms(time.perf_counter() - t_sql)
+
+    df, backend, read_sql_ms = _run_with_failover(_run)
 
     total_ms = _fmt_ms(time.perf_counter() - total_t0)
     _trace(
@@ -506,6 +788,7 @@ def _qdf_cached(data_version: str, sql: str, params: dict[str, Any] | None) -> p
         dv_sig=_sig(data_version),
         sql_sig=_sig(sql),
         params_sig=_sig(params or {}),
+        backend=backend,
         rows=len(df),
         read_sql_ms=read_sql_ms,
         qdf_total_ms=total_ms,
@@ -525,13 +808,116 @@ def _qdf_cached(data_version: str, sql: str, params: dict[str, Any] | None) -> p
     return df
 
 
-def qdf(sql: str, params: dict[str, Any] | None = None) -> pd.DataFrame:
+@st.cache_data(ttl=QDF_TTL, show_spinner=False)
+def _q_row_cached(data_version: str, sql: str, params: dict[str, Any] | None) -> dict[str, Any]:
+    # Consultas de una fila (KPIs, COUNT): fetchone directo, sin DataFrame ni inferencia de dtypes.
+    cache_sig = _sig(data_version, sql, params or {})
+    _set_mark("QUERY", "q_row", cache_sig)
+
+    t0 = time.perf_counter()
+
+    def _run(eng: Engine) -> dict[str, Any]:
+        with eng.connect() as conn:
+            row = conn.execute(_sql_text(sql), params or {}).mappings().fetchone()
+        return dict(row) if row is not None else {}
+
+    out = _run_with_failover(_run)
+    _trace(
+        "QUERY",
+        "q_row_exec",
+        dv_sig=_sig(data_version),
+        sql_sig=_sig(sql),
+        params_sig=_sig(params or {}),
+        found=bool(out),
+        q_row_ms=_fmt_ms(time.perf_counter() - t0),
+    )
+    return out
+
+
+def q_row(sql: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    # Mismo contrato de cache que qdf (data_version + sql + params); {} si no hay fila.
     total_t0 = time.perf_counter()
+    params = _canon_params(params)
     dv, dv_state = _get_data_version_with_state()
     cache_sig = _sig(dv, sql, params or {})
-    before = _get_mark("QUERY", "qdf", cache_sig)
-    df = _qdf_cached(dv, sql, params)
-    cache_state = "miss" if _get_mark("QUERY", "qdf", cache_sig) != before else "hit"
+    before = _get_mark("QUERY", "q_row", cache_sig)
+    out = _q_row_cached(dv, sql, params)
+    cache_state = "miss" if _get_mark("QUERY", "q_row", cache_sig) != before else "hit"
+    _trace(
+        "QUERY",
+        "q_row",
+        dv_sig=_sig(dv),
+        sql_sig=_sig(sql),
+        params_sig=_sig(params or {}),
+        q_row_total_ms=_fmt_ms(time.perf_counter() - total_t0),
+        cache_state=cache_state,
+        dv_state=dv_state,
+    )
+    return dict(out)
+
+
+def q_scalar(sql: str, params: dict[str, Any] | None = None, default: Any = None) -> Any:
+    row = q_row(sql, params)
+    return next(iter(row.values()), default) if row else default
+
+
+_QDF_LOCAL: OrderedDict[tuple[str, str, str], tuple[float, pd.DataFrame, int]] = OrderedDict()
+_QDF_LOCAL_LOCK = threading.Lock()
+_QDF_LOCAL_BYTES = 0
+
+
+def _qdf_local_get(key: tuple[str, str, str]) -> pd.DataFrame | None:
+    global _QDF_LOCAL_BYTES
+    with _QDF_LOCAL_LOCK:
+        hit = _QDF_LOCAL.get(key)
+        if hit is None:
+            return None
+        if time.monotonic() - hit[0] > QDF_TTL:
+            del _QDF_LOCAL[key]
+            _QDF_LOCAL_BYTES -= hit[2]
+            return None
+        _QDF_LOCAL.move_to_end(key)
+        return hit[1]
+
+
+def _qdf_local_put(key: tuple[str, str, str], df: pd.DataFrame) -> None:
+    global _QDF_LOCAL_BYTES
+    max_bytes = QDF_LOCAL_CACHE_MB * 1024 * 1024
+    nbytes = int(df.memory_usage(index=True).sum())
+    if nbytes > max_bytes:
+        return
+    with _QDF_LOCAL_LOCK:
+        old = _QDF_LOCAL.pop(key, None)
+        if old is not None:
+            _QDF_LOCAL_BYTES -= old[2]
+        _QDF_LOCAL[key] = (time.monotonic(), df, nbytes)
+        _QDF_LOCAL_BYTES += nbytes
+        while len(_QDF_LOCAL) > QDF_LOCAL_CACHE_SIZE or _QDF_LOCAL_BYTES > max_bytes:
+            _, evicted = _QDF_LOCAL.popitem(last=False)
+            _QDF_LOCAL_BYTES -= evicted[2]
+
+
+def qdf(sql: str, params: dict[str, Any] | None = None, stream: bool = False) -> pd.DataFrame:
+    total_t0 = time.perf_counter()
+    params = _canon_params(params)
+    dv, dv_state = _get_data_version_with_state()
+    cache_sig = _sig(dv, sql, params or {})
+    local_key = (dv, sql, json.dumps(params or {}, sort_keys=True, default=str))
+    use_local = QDF_LOCAL_CACHE_SIZE > 0 and not stream
+    df = _qdf_local_get(local_key) if use_local else None
+    if df is not None:
+        cache_state = "local_hit"
+    else:
+        before = _get_mark("QUERY", "qdf", cache_sig)
+        df = _qdf_cached(dv, sql, params, stream)
+        cache_state = "miss" if _get_mark("QUERY", "qdf", cache_sig) != before else "hit"
+        if use_local and df is not None:
+            _qdf_local_put(local_key, df)
+    # Sólo si el frame pasa por el LRU (guardado por referencia): el llamador recibe su propia
+    # copia (memcpy, sin pickle) para que mutarla no contamine el cache local. stream=True no
+    # entra al LRU y ya es una copia fresca de st.cache_data.
+    if use_local and df is not None:
+        df = df.copy()
     total_ms = _fmt_ms(time.perf_counter() - total_t0)
     _trace(
         "QUERY",
@@ -560,16 +946,25 @@ def qdf(sql: str, params: dict[str, Any] | None = None) -> pd.DataFrame:
 
 
 @st.cache_data(ttl=SELECTOR_TTL, show_spinner=False)
-def _selector_df_cached(name: str, sql: str, params: dict[str, Any] | None = None) -> pd.DataFrame:
-    cache_sig = _sig(name, sql, params or {})
+def _selector_df_cached(
+    name: str,
+    sql: str,
+    params: dict[str, Any] | None = None,
+    data_version: str = "",
+) -> pd.DataFrame:
+    # data_version sólo entra a la clave de cache (como en qdf), nunca como bind al SQL.
+    cache_sig = _sig(name, sql, params or {}, data_version)
     _set_mark("SELECTOR", name, cache_sig)
 
-    eng = get_engine()
     total_t0 = time.perf_counter()
-    with eng.connect() as conn:
-        t_sql = time.perf_counter()
-        df = pd.read_sql(text(sql), conn, params=params)
-        read_sql_ms = _fmt_ms(time.perf_counter() - t_sql)
+
+    def _run(eng: Engine) -> tuple[pd.DataFrame, str]:
+        with eng.connect() as conn:
+            t_sql = time.perf_counter()
+            df = pd.read_sql(_sql_text(sql), conn, params=params)
+            return df, _fmt_ms(time.perf_counter() - t_sql)
+
+    df, read_sql_ms = _run_with_failover(_run)
 
     total_ms = _fmt_ms(time.perf_counter() - total_t0)
     _trace(
@@ -581,16 +976,22 @@ def _selector_df_cached(name: str, sql: str, params: dict[str, Any] | None = Non
         rows=len(df),
         selector_read_sql_ms=read_sql_ms,
         selector_total_ms=total_ms,
-        dv_state="not_used",
+        dv_state="used" if data_version else "not_used",
     )
     return df
 
 
-def _selector_df(name: str, sql: str, params: dict[str, Any] | None = None) -> pd.DataFrame:
+def _selector_df(
+    name: str,
+    sql: str,
+    params: dict[str, Any] | None = None,
+    data_version: str = "",
+) -> pd.DataFrame:
     total_t0 = time.perf_counter()
-    cache_sig = _sig(name, sql, params or {})
+    params = _canon_params(params)
+    cache_sig = _sig(name, sql, params or {}, data_version)
     before = _get_mark("SELECTOR", name, cache_sig)
-    df = _selector_df_cached(name, sql, params)
+    df = _selector_df_cached(name, sql, params, data_version)
     cache_state = "miss" if _get_mark("SELECTOR", name, cache_sig) != before else "hit"
     _trace(
         "SELECTOR",
@@ -601,11 +1002,50 @@ def _selector_df(name: str, sql: str, params: dict[str, Any] | None = None) -> p
         rows=0 if df is None else len(df),
         selector_total_ms=_fmt_ms(time.perf_counter() - total_t0),
         cache_state=cache_state,
-        dv_state="not_used",
+        dv_state="used" if data_version else "not_used",
     )
     return df
 
 
+@st.cache_data(ttl=SELECTOR_TTL, show_spinner=False)
+def _selector_values_cached(
+    name: str,
+    sql: str,
+    params: dict[str, Any] | None,
+    column: str,
+    data_version: str = "",
+) -> tuple[str, ...]:
+    _set_mark("SELECTOR", f"{name}:values", _sig(name, sql, params or {}, column, data_version))
+    df = _selector_df(name, sql, params, data_version)
+    if df is None or df.empty or column not in df.columns:
+        return ()
+    return tuple(df[column].astype(str).tolist())
+
+
+def _selector_values(
+    name: str,
+    sql: str,
+    params: dict[str, Any] | None = None,
+    column: str = "",
+    data_version: str = "",
+) -> list[str]:
+    # Opciones de selectbox ya casteadas a str: el astype se paga una vez por TTL, no por rerun.
+    params = _canon_params(params)
+    cache_sig = _sig(name, sql, params or {}, column, data_version)
+    before = _get_mark("SELECTOR", f"{name}:values", cache_sig)
+    values = _selector_values_cached(name, sql, params, column, data_version)
+    cache_state = "miss" if _get_mark("SELECTOR", f"{name}:values", cache_sig) != before else "hit"
+    _trace(
+        "SELECTOR",
+        f"{name}:values",
+        selector=name,
+        rows=len(values),
+        cache_state=cache_state,
+        dv_state="used" if data_version else "not_used",
+    )
+    return list(values)
+
+
 # =========================================================
 # 2) HELPERS DE SCOPE / FILTROS
 # =========================================================
@@ -628,9 +1068,16 @@ def _build_result_filters(
     params: dict[str, Any] = {}
     filters: list[str] = []
 
-    if marcas:
+    # Lista canonica (sin duplicados, ordenada): mismo SQL/params para la misma seleccion.
+    # Los valores van tal cual: una seleccion sólo de marcas en blanco sigue sin calzar filas.
+    # Con una sola marca se usa igualdad simple; el planner la resuelve contra (cod_rt, marca).
+    marcas_norm = sorted({str(m) for m in (marcas or [])})
+    if len(marcas_norm) == 1:
+        filters.append(f'AND {pfx}"MARCA" = :marca')
+        params["marca"] = marcas_norm[0]
+    elif marcas_norm:
         filters.append(f'AND {pfx}"MARCA" = ANY(:marcas)')
-        params["marcas"] = marcas
+        params["marcas"] = marcas_norm
 
     valid_focos = ["Venta 0", "Negativo", "Quiebres", "Otros"]
 
@@ -673,16 +1120,19 @@ def _build_result_filters(
 
     s = (search or "").strip()
     if len(s) >= 2:
+        # Un solo predicado sobre sku + descripción + marca: misma expresión que el índice
+        # trigram de sql/25_pg_trgm_search_concat_index.sql (un index scan en vez de un
+        # BitmapOr de tres). Descripción con COALESCE para que un NULL no anule la fila.
         filters.append(
             f"""
-            AND (
-                CAST({pfx}"Sku" AS TEXT) ILIKE :q
-                OR COALESCE({pfx}"Descripción del Producto", '') ILIKE :q
-                OR COALESCE({pfx}"MARCA", '') ILIKE :q
-            )
+            AND LOWER(
+                CAST({pfx}"Sku" AS TEXT) || ' ' || COALESCE({pfx}"Descripción del Producto", '') || ' ' || {pfx}"MARCA"
+            ) LIKE LOWER(:q)
             """
         )
-        params["q"] = f"%{s}%"
+        # La comparación ya es case-insensitive (LOWER en ambos lados): el patrón en minúsculas
+        # hace que "Coca", "coca " y "COCA" compartan la misma entrada de cache.
+        params["q"] = f"%{s.lower()}%"
 
     return "\n".join(filters), params
 
@@ -722,7 +1172,7 @@ def _rr_scope_exists(alias: str = "v", modalidad: str | None = None) -> tuple[st
 # 3) SELECTORES / CONTEXTO DESDE RUTA_RUTERO
 # =========================================================
 def get_rutero_reponedor() -> pd.DataFrame:
-    return qdf(f"""
+    sql = f"""
         SELECT DISTINCT
             TRIM(rutero) AS rutero,
             TRIM(reponedor) AS reponedor
@@ -730,11 +1180,12 @@ def get_rutero_reponedor() -> pd.DataFrame:
         WHERE NULLIF(TRIM(COALESCE(rutero, '')), '') IS NOT NULL
           AND NULLIF(TRIM(COALESCE(reponedor, '')), '') IS NOT NULL
         ORDER BY rutero, reponedor
-    """)
+    """
+    return _selector_df("get_rutero_reponedor", sql)
 
 
 def get_locales(rutero: str, reponedor: str) -> pd.DataFrame:
-    return qdf(f"""
+    sql = f"""
         SELECT DISTINCT
             cod_rt,
             COALESCE(NULLIF(TRIM(local_nombre), ''), cod_rt) AS nombre_local_rr
@@ -743,10 +1194,17 @@ def get_locales(rutero: str, reponedor: str) -> pd.DataFrame:
           AND UPPER(TRIM(COALESCE(reponedor, ''))) = UPPER(TRIM(COALESCE(:reponedor, '')))
           AND NULLIF(TRIM(COALESCE(cod_rt, '')), '') IS NOT NULL
         ORDER BY cod_rt, nombre_local_rr
-    """, {"rutero": rutero, "reponedor": reponedor})
+    """
+    return _selector_df("get_locales", sql, {"rutero": rutero, "reponedor": reponedor})
 
 
-def get_contexto_local(
+# Bundle por local: contexto (nombre/clientes/modalidades/mercaderistas) + lista de clientes
+# del selector en un solo query sobre RUTA_TABLE, cacheado como un único selector.
+_CLIENTES_LISTA_SQL = """ARRAY_AGG(DISTINCT TRIM(cliente) ORDER BY TRIM(cliente))
+                FILTER (WHERE NULLIF(TRIM(COALESCE(cliente, '')), '') IS NOT NULL) AS clientes_lista"""
+
+
+def _local_bundle(
     rutero: str,
     reponedor: str,
     cod_rt: str,
@@ -759,7 +1217,8 @@ def get_contexto_local(
             MAX(COALESCE(NULLIF(TRIM(local_nombre), ''), cod_rt)) AS nombre_local_rr,
             STRING_AGG(DISTINCT NULLIF(TRIM(cliente), ''), ' | ' ORDER BY NULLIF(TRIM(cliente), '')) AS clientes,
             STRING_AGG(DISTINCT NULLIF(TRIM(modalidad), ''), ' | ' ORDER BY NULLIF(TRIM(modalidad), '')) AS modalidades,
-            STRING_AGG(DISTINCT NULLIF(TRIM(reponedor), ''), ' | ' ORDER BY NULLIF(TRIM(reponedor), '')) AS mercaderistas
+            STRING_AGG(DISTINCT NULLIF(TRIM(reponedor), ''), ' | ' ORDER BY NULLIF(TRIM(reponedor), '')) AS mercaderistas,
+            {_CLIENTES_LISTA_SQL}
         FROM {RUTA_TABLE}
         WHERE cod_rt = :cod_rt
           AND UPPER(TRIM(COALESCE(rutero, ''))) = UPPER(TRIM(COALESCE(:rutero, '')))
@@ -773,7 +1232,16 @@ def get_contexto_local(
         "cod_rt": cod_rt,
         **extra,
     }
-    return _selector_df("get_contexto_local", sql, params)
+    return _selector_df("local_bundle", sql, params)
+
+
+def get_contexto_local(
+    rutero: str,
+    reponedor: str,
+    cod_rt: str,
+    modalidad: str | None = None,
+) -> pd.DataFrame:
+    return _local_bundle(rutero, reponedor, cod_rt, modalidad).drop(columns=["clientes_lista"], errors="ignore")
 
 
 def get_modalidades_home() -> list[str]:
@@ -782,8 +1250,7 @@ def get_modalidades_home() -> list[str]:
         FROM {SELECTOR_MODALIDAD_VIEW}
         ORDER BY modalidad
     """
-    df = _selector_df("get_modalidades_home", sql)
-    return df["modalidad"].astype(str).tolist() if df is not None and not df.empty else []
+    return _selector_values("get_modalidades_home", sql, column="modalidad")
 
 
 def get_rutero_reponedor_por_modalidad(modalidad: str) -> pd.DataFrame:
@@ -831,16 +1298,15 @@ def get_locales_home() -> pd.DataFrame:
     return _selector_df("get_locales_home", sql)
 
 
+def _local_bundle_clientes(df: pd.DataFrame | None) -> list[str]:
+    if df is None or df.empty or "clientes_lista" not in df.columns:
+        return []
+    return [str(c) for c in (df["clientes_lista"].iloc[0] or [])]
+
+
 def get_clientes_local_home(cod_rt: str) -> list[str]:
-    df = qdf(f"""
-        SELECT DISTINCT
-            TRIM(cliente) AS cliente
-        FROM {RUTA_TABLE}
-        WHERE cod_rt = :cod_rt
-          AND NULLIF(TRIM(COALESCE(cliente, '')), '') IS NOT NULL
-        ORDER BY cliente
-    """, {"cod_rt": cod_rt})
-    return df["cliente"].astype(str).tolist() if df is not None and not df.empty else []
+    # Sale del mismo bundle que get_contexto_local_home: un viaje y una entrada de cache por local.
+    return _local_bundle_clientes(_local_bundle_home(cod_rt))
 
 
 def get_clientes_local_mercaderista(
@@ -849,33 +1315,22 @@ def get_clientes_local_mercaderista(
     rutero: str,
     reponedor: str,
 ) -> list[str]:
-    modalidad_sql, extra = _modalidad_clause(modalidad, "modalidad")
-    df = qdf(f"""
-        SELECT DISTINCT
-            TRIM(cliente) AS cliente
-        FROM {RUTA_TABLE}
-        WHERE cod_rt = :cod_rt
-          AND UPPER(TRIM(COALESCE(rutero, ''))) = UPPER(TRIM(COALESCE(:rutero, '')))
-          AND UPPER(TRIM(COALESCE(reponedor, ''))) = UPPER(TRIM(COALESCE(:reponedor, '')))
-          {modalidad_sql}
-          AND NULLIF(TRIM(COALESCE(cliente, '')), '') IS NOT NULL
-        ORDER BY cliente
-    """, {"cod_rt": cod_rt, "rutero": rutero, "reponedor": reponedor, **extra})
-    return df["cliente"].astype(str).tolist() if df is not None and not df.empty else []
+    return _local_bundle_clientes(_local_bundle(rutero, reponedor, cod_rt, modalidad))
 
 
 def get_mercaderistas_home() -> pd.DataFrame:
-    return qdf(f"""
+    sql = f"""
         SELECT DISTINCT
             TRIM(reponedor) AS mercaderista
         FROM {RUTA_TABLE}
         WHERE NULLIF(TRIM(COALESCE(reponedor, '')), '') IS NOT NULL
         ORDER BY mercaderista
-    """)
+    """
+    return _selector_df("get_mercaderistas_home", sql)
 
 
 def get_locales_por_mercaderista(mercaderista: str) -> pd.DataFrame:
-    return qdf(f"""
+    sql = f"""
         SELECT DISTINCT
             cod_rt,
             COALESCE(NULLIF(TRIM(local_nombre), ''), cod_rt) AS nombre_local
@@ -883,10 +1338,11 @@ def get_locales_por_mercaderista(mercaderista: str) -> pd.DataFrame:
         WHERE UPPER(TRIM(COALESCE(reponedor, ''))) = UPPER(TRIM(COALESCE(:mercaderista, '')))
           AND NULLIF(TRIM(COALESCE(cod_rt, '')), '') IS NOT NULL
         ORDER BY cod_rt, nombre_local
-    """, {"mercaderista": mercaderista})
+    """
+    return _selector_df("get_locales_por_mercaderista", sql, {"mercaderista": mercaderista})
 
 
-def get_contexto_local_home(cod_rt: str) -> pd.DataFrame:
+def _local_bundle_home(cod_rt: str) -> pd.DataFrame:
     sql = f"""
         SELECT
             cod_rt,
@@ -896,25 +1352,38 @@ def get_contexto_local_home(cod_rt: str) -> pd.DataFrame:
             STRING_AGG(DISTINCT NULLIF(TRIM(reponedor), ''), ' | '
                        ORDER BY NULLIF(TRIM(reponedor), '')) AS mercaderistas,
             STRING_AGG(DISTINCT NULLIF(TRIM(modalidad), ''), ' | '
-                       ORDER BY NULLIF(TRIM(modalidad), '')) AS modalidades
+                       ORDER BY NULLIF(TRIM(modalidad), '')) AS modalidades,
+            {_CLIENTES_LISTA_SQL}
         FROM {RUTA_TABLE}
         WHERE cod_rt = :cod_rt
         GROUP BY cod_rt
     """
-    return _selector_df("get_contexto_local_home", sql, {"cod_rt": cod_rt})
+    return _selector_df("local_bundle_home", sql, {"cod_rt": cod_rt})
+
+
+def get_contexto_local_home(cod_rt: str) -> pd.DataFrame:
+    return _local_bundle_home(cod_rt).drop(columns=["clientes_lista"], errors="ignore")
 
 
 # =========================================================
 # 4) RESULTADOS LOCAL / MERCADERISTA SOBRE VISTA PUENTE
 # =========================================================
 def get_marcas_local(cod_rt: str) -> list[str]:
-    df = qdf(f"""
+    # Marcas por local: cache de selector (SELECTOR_TTL), no se re-consulta al cambiar foco/búsqueda.
+    # data_version entra a la clave de cache (no al SQL) para invalidar con cada carga nueva.
+    sql = f"""
         SELECT DISTINCT v."MARCA" AS marca
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
         ORDER BY marca
-    """, {"cod_rt": cod_rt})
-    return df["marca"].astype(str).tolist() if df is not None and not df.empty else []
+    """
+    return _selector_values(
+        "get_marcas_local",
+        sql,
+        {"cod_rt": cod_rt},
+        column="marca",
+        data_version=get_data_version(),
+    )
 
 
 def get_marcas(
@@ -924,40 +1393,98 @@ def get_marcas(
     modalidad: str | None = None,
 ) -> list[str]:
     exists_sql, extra = _rr_scope_exists("v", modalidad=modalidad)
-    df = qdf(f"""
+    sql = f"""
         SELECT DISTINCT v."MARCA" AS marca
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
           AND {exists_sql}
         ORDER BY marca
-    """, {
-        "rutero": rutero,
-        "reponedor": reponedor,
-        "cod_rt": cod_rt,
-        **extra,
-    })
-    return df["marca"].astype(str).tolist() if df is not None and not df.empty else []
+    """
+    return _selector_values(
+        "get_marcas",
+        sql,
+        {"rutero": rutero, "reponedor": reponedor, "cod_rt": cod_rt, **extra},
+        column="marca",
+        data_version=get_data_version(),
+    )
+
+
+KPI_COLUMNS = ("fecha_stock", "total_skus", "venta_0", "negativos", "quiebres", "otros")
+
+
+def _kpi_columns_sql(alias: str = "v", window: bool = False) -> str:
+    # window=True emite los agregados como OVER () para viajar junto a las filas de una página.
+    pfx = f"{alias}." if alias else ""
+    over = " OVER ()" if window else ""
+    return f"""MAX({pfx}fecha){over} AS fecha_stock,
+            COUNT(*){over}::int AS total_skus,
+            COALESCE(SUM(CASE WHEN COALESCE({pfx}"Venta(+7)", 0) = 0 THEN 1 ELSE 0 END){over}, 0)::int AS venta_0,
+            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE({pfx}"NEGATIVO", ''))) = 'SI' THEN 1 ELSE 0 END){over}, 0)::int AS negativos,
+            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE({pfx}"RIESGO DE QUIEBRE", ''))) = 'SI' THEN 1 ELSE 0 END){over}, 0)::int AS quiebres,
+            COALESCE(SUM(CASE
+                WHEN NULLIF(TRIM(COALESCE({pfx}"OTROS", '')), '') IS NOT NULL
+                 AND UPPER(TRIM(COALESCE({pfx}"OTROS", ''))) NOT IN ('NO', 'N/A', 'NA', '-')
+                THEN 1 ELSE 0
+            END){over}, 0)::int AS otros"""
+
+
+def _tabla_ux_page_columns_sql(alias: str = "v") -> str:
+    # Proyección de pantalla: "OTROS" (texto libre) viaja como flag; el texto sólo lo leen los exports.
+    pfx = f"{alias}." if alias else ""
+    return f"""{pfx}fecha,
+          {pfx}"MARCA", {pfx}"Sku", {pfx}"Descripción del Producto",
+          {pfx}"Stock", {pfx}"Venta(+7)", {pfx}"NEGATIVO", {pfx}"RIESGO DE QUIEBRE",
+          UPPER(TRIM(COALESCE({pfx}"OTROS", ''))) NOT IN ('', 'NO', 'N/A', 'NA', '-') AS otros_flag"""
+
+
+def _tabla_ux_sort_key_sql(alias: str = "v") -> str:
+    # Orden de pantalla (MARCA -> SKU numérico -> SKU texto -> descripción) como lista de
+    # expresiones: la usan el ORDER BY y la comparación keyset, así ambos ordenan igual.
+    # SKU numérico = sólo dígitos, hasta 18 (cabe en bigint; mismo contrato que sql/19 y exports).
+    # Sin NULLs en la tupla (marca/sku son NOT NULL; descripción va con COALESCE) para que la
+    # comparación de filas no descarte registros.
+    pfx = f"{alias}." if alias else ""
+    return f"""{pfx}"MARCA",
+          CASE WHEN {pfx}"Sku" ~ '^[0-9]{{1,18}}$' THEN 0 ELSE 1 END,
+          CASE WHEN {pfx}"Sku" ~ '^[0-9]{{1,18}}$' THEN ({pfx}"Sku")::bigint ELSE 0 END,
+          {pfx}"Sku",
+          COALESCE({pfx}"Descripción del Producto", '')"""
+
+
+def _tabla_ux_keyset(after: tuple | None, alias: str = "v") -> tuple[str, dict]:
+    # after = (MARCA, Sku, Descripción) de la última fila de la página anterior. Las claves
+    # derivadas del SKU se calculan acá: castear el parámetro en SQL rompería con SKUs texto.
+    if not after:
+        return "", {}
+    marca, sku, desc = ("" if pd.isna(x) else str(x) for x in after)
+    sku_num = re.fullmatch(r"[0-9]{1,18}", sku) is not None
+    return f"AND ({_tabla_ux_sort_key_sql(alias)}) > (:after_marca, :after_sku_txt, :after_sku_num, :after_sku, :after_desc)", {
+        "after_marca": marca,
+        "after_sku_txt": 0 if sku_num else 1,
+        "after_sku_num": int(sku) if sku_num else 0,
+        "after_sku": sku,
+        "after_desc": desc,
+    }
+
+
+def tabla_ux_cursor(df: pd.DataFrame | None) -> tuple | None:
+    # Cursor keyset para la página siguiente: clave de orden de la última fila.
+    if df is None or df.empty:
+        return None
+    last = df.iloc[-1]
+    return (last["MARCA"], last["Sku"], last.get("Descripción del Producto"))
 
 
 def get_kpis_local_home(
     cod_rt: str,
     marcas: list[str] | None = None,
     cliente: str | None = None,
-) -> pd.DataFrame:
+) -> dict[str, Any]:
     where_extra, p2 = _build_result_filters(marcas, search="", foco="Todo", alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
-    return qdf(f"""
+    return q_row(f"""
         SELECT
-            MAX(v.fecha) AS fecha_stock,
-            COUNT(*)::int AS total_skus,
-            COALESCE(SUM(CASE WHEN COALESCE(v."Venta(+7)", 0) = 0 THEN 1 ELSE 0 END), 0)::int AS venta_0,
-            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE(v."NEGATIVO", ''))) = 'SI' THEN 1 ELSE 0 END), 0)::int AS negativos,
-            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE(v."RIESGO DE QUIEBRE", ''))) = 'SI' THEN 1 ELSE 0 END), 0)::int AS quiebres,
-            COALESCE(SUM(CASE
-                WHEN NULLIF(TRIM(COALESCE(v."OTROS", '')), '') IS NOT NULL
-                 AND UPPER(TRIM(COALESCE(v."OTROS", ''))) NOT IN ('NO', 'N/A', 'NA', '-')
-                THEN 1 ELSE 0
-            END), 0)::int AS otros
+            {_kpi_columns_sql("v")}
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
         {where_extra}
@@ -972,22 +1499,13 @@ def get_kpis_local(
     marcas: list[str] | None = None,
     modalidad: str | None = None,
     cliente: str | None = None,
-) -> pd.DataFrame:
+) -> dict[str, Any]:
     exists_sql, extra = _rr_scope_exists("v", modalidad=modalidad)
     where_extra, p2 = _build_result_filters(marcas, search="", foco="Todo", alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
-    return qdf(f"""
+    return q_row(f"""
         SELECT
-            MAX(v.fecha) AS fecha_stock,
-            COUNT(*)::int AS total_skus,
-            COALESCE(SUM(CASE WHEN COALESCE(v."Venta(+7)", 0) = 0 THEN 1 ELSE 0 END), 0)::int AS venta_0,
-            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE(v."NEGATIVO", ''))) = 'SI' THEN 1 ELSE 0 END), 0)::int AS negativos,
-            COALESCE(SUM(CASE WHEN UPPER(TRIM(COALESCE(v."RIESGO DE QUIEBRE", ''))) = 'SI' THEN 1 ELSE 0 END), 0)::int AS quiebres,
-            COALESCE(SUM(CASE
-                WHEN NULLIF(TRIM(COALESCE(v."OTROS", '')), '') IS NOT NULL
-                 AND UPPER(TRIM(COALESCE(v."OTROS", ''))) NOT IN ('NO', 'N/A', 'NA', '-')
-                THEN 1 ELSE 0
-            END), 0)::int AS otros
+            {_kpi_columns_sql("v")}
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
           AND {exists_sql}
@@ -1003,23 +1521,40 @@ def get_kpis_local(
     })
 
 
-def get_tabla_ux_total_home(
+def _tabla_ux_home_where(
     cod_rt: str,
     marcas: list[str] | None = None,
     foco: str = "Todo",
     search: str = "",
     cliente: str | None = None,
-) -> int:
+) -> tuple[str, dict]:
+    # WHERE común (local + filtros de tabla) para total, página y export del modo LOCAL, igual que
+    # _tabla_ux_rr_where: el conteo cacheado aparte y la página nunca divergen en el scope.
     where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
-    df = qdf(f"""
-        SELECT COUNT(*)::int AS total
-        FROM {RESULT_VIEW} v
+    where_sql = f"""
         WHERE v.cod_rt = :cod_rt
         {where_extra}
         {cliente_where}
-    """, {"cod_rt": cod_rt, **p2, **cliente_params})
-    return int(df.iloc[0]["total"]) if df is not None and not df.empty else 0
+    """
+    return where_sql, {"cod_rt": cod_rt, **p2, **cliente_params}
+
+
+def get_tabla_ux_total_home(
+    cod_rt: str,
+    marcas: list[str] | None = None,
+    foco: str = "Todo",
+    search: str = "",
+    cliente: str | None = None,
+) -> int:
+    # q_scalar cachea por data_version + params: al cambiar de página el conteo es un hit.
+    where_sql, params = _tabla_ux_home_where(cod_rt, marcas, foco, search, cliente)
+    total = q_scalar(f"""
+        SELECT COUNT(*)::int AS total
+        FROM {RESULT_VIEW} v
+        {where_sql}
+    """, params)
+    return int(total or 0)
 
 
 def get_tabla_ux_page_home(
@@ -1030,31 +1565,52 @@ def get_tabla_ux_page_home(
     foco: str = "Todo",
     search: str = "",
     cliente: str | None = None,
+    after: tuple | None = None,
 ) -> pd.DataFrame:
+    # Con cursor (after) la página es keyset: range scan desde la última fila vista, sin OFFSET.
+    page = max(int(page or 1), 1)
+    where_sql, params = _tabla_ux_home_where(cod_rt, marcas, foco, search, cliente)
+    keyset_where, keyset_params = _tabla_ux_keyset(after, alias="v")
+    return qdf(f"""
+        SELECT
+          {_tabla_ux_page_columns_sql("v")}
+        FROM {RESULT_VIEW} v
+        {where_sql}
+          {keyset_where}
+        ORDER BY
+          {_tabla_ux_sort_key_sql("v")}
+        LIMIT :limit OFFSET :offset
+    """, {
+        **params,
+        **keyset_params,
+        "limit": int(page_size),
+        "offset": 0 if keyset_where else (page - 1) * int(page_size),
+    })
+
+
+def get_tabla_ux_page_kpis_home(
+    cod_rt: str,
+    page: int = 1,
+    page_size: int = 25,
+    cliente: str | None = None,
+) -> pd.DataFrame:
+    # Página sin filtros de tabla + KPIs del local en un solo viaje (columnas KPI_COLUMNS).
     page = max(int(page or 1), 1)
-    where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
     return qdf(f"""
         SELECT
-          v.fecha,
-          v."MARCA", v."Sku", v."Descripción del Producto",
-          v."Stock", v."Venta(+7)", v."NEGATIVO", v."RIESGO DE QUIEBRE", v."OTROS"
+          {_tabla_ux_page_columns_sql("v")},
+          {_kpi_columns_sql("v", window=True)}
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
-        {where_extra}
         {cliente_where}
         ORDER BY
-          v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
-          v."Sku" ASC,
-          v."Descripción del Producto" ASC
+          {_tabla_ux_sort_key_sql("v")}
         LIMIT :limit OFFSET :offset
     """, {
         "cod_rt": cod_rt,
         "limit": int(page_size),
         "offset": (page - 1) * int(page_size),
-        **p2,
         **cliente_params,
     })
 
@@ -1067,27 +1623,22 @@ def get_tabla_ux_export_home(
     search: str = "",
     cliente: str | None = None,
 ) -> pd.DataFrame:
-    where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
-    cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
+    where_sql, params = _tabla_ux_home_where(cod_rt, marcas, foco, search, cliente)
     return qdf(f"""
         SELECT
           v.fecha,
           v."MARCA", v."Sku", v."Descripción del Producto",
           v."Stock", v."Venta(+7)", v."NEGATIVO", v."RIESGO DE QUIEBRE", v."OTROS"
         FROM {RESULT_VIEW} v
-        WHERE v.cod_rt = :cod_rt
-        {where_extra}
-        {cliente_where}
+        {where_sql}
         ORDER BY
           v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
           v."Sku" ASC,
           v."Descripción del Producto" ASC
-    """, {"cod_rt": cod_rt, **p2, **cliente_params})
+    """, params, stream=True)
 
 
-def get_tabla_ux_total(
+def _tabla_ux_rr_where(
     rutero: str,
     reponedor: str,
     cod_rt: str,
@@ -1096,26 +1647,48 @@ def get_tabla_ux_total(
     search: str = "",
     modalidad: str | None = None,
     cliente: str | None = None,
-) -> int:
+) -> tuple[str, dict]:
+    # WHERE común (scope RR + filtros de tabla) para total, página y export: mismo texto y mismos
+    # params, así el conteo cacheado y la página nunca divergen en el scope.
     exists_sql, extra = _rr_scope_exists("v", modalidad=modalidad)
     where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
-    df = qdf(f"""
-        SELECT COUNT(*)::int AS total
-        FROM {RESULT_VIEW} v
+    where_sql = f"""
         WHERE v.cod_rt = :cod_rt
           AND {exists_sql}
           {where_extra}
           {cliente_where}
-    """, {
+    """
+    return where_sql, {
         "rutero": rutero,
         "reponedor": reponedor,
         "cod_rt": cod_rt,
         **extra,
         **p2,
         **cliente_params,
-    })
-    return int(df.iloc[0]["total"]) if df is not None and not df.empty else 0
+    }
+
+
+def get_tabla_ux_total(
+    rutero: str,
+    reponedor: str,
+    cod_rt: str,
+    marcas: list[str] | None = None,
+    foco: str = "Todo",
+    search: str = "",
+    modalidad: str | None = None,
+    cliente: str | None = None,
+) -> int:
+    # q_scalar cachea por data_version + params: al cambiar de página el conteo es un hit.
+    where_sql, params = _tabla_ux_rr_where(
+        rutero, reponedor, cod_rt, marcas, foco, search, modalidad, cliente
+    )
+    total = q_scalar(f"""
+        SELECT COUNT(*)::int AS total
+        FROM {RESULT_VIEW} v
+        {where_sql}
+    """, params)
+    return int(total or 0)
 
 
 def get_tabla_ux_page(
@@ -1129,27 +1702,53 @@ def get_tabla_ux_page(
     search: str = "",
     modalidad: str | None = None,
     cliente: str | None = None,
+    after: tuple | None = None,
+) -> pd.DataFrame:
+    page = max(int(page or 1), 1)
+    where_sql, params = _tabla_ux_rr_where(
+        rutero, reponedor, cod_rt, marcas, foco, search, modalidad, cliente
+    )
+    keyset_where, keyset_params = _tabla_ux_keyset(after, alias="v")
+    return qdf(f"""
+        SELECT
+          {_tabla_ux_page_columns_sql("v")}
+        FROM {RESULT_VIEW} v
+        {where_sql}
+          {keyset_where}
+        ORDER BY
+          {_tabla_ux_sort_key_sql("v")}
+        LIMIT :limit OFFSET :offset
+    """, {
+        **params,
+        **keyset_params,
+        "limit": int(page_size),
+        "offset": 0 if keyset_where else (page - 1) * int(page_size),
+    })
+
+
+def get_tabla_ux_page_kpis(
+    rutero: str,
+    reponedor: str,
+    cod_rt: str,
+    page: int = 1,
+    page_size: int = 25,
+    modalidad: str | None = None,
+    cliente: str | None = None,
 ) -> pd.DataFrame:
+    # Página sin filtros de tabla + KPIs del scope RR en un solo viaje (columnas KPI_COLUMNS).
     page = max(int(page or 1), 1)
     exists_sql, extra = _rr_scope_exists("v", modalidad=modalidad)
-    where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
     cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
     return qdf(f"""
         SELECT
-          v.fecha,
-          v."MARCA", v."Sku", v."Descripción del Producto",
-          v."Stock", v."Venta(+7)", v."NEGATIVO", v."RIESGO DE QUIEBRE", v."OTROS"
+          {_tabla_ux_page_columns_sql("v")},
+          {_kpi_columns_sql("v", window=True)}
         FROM {RESULT_VIEW} v
         WHERE v.cod_rt = :cod_rt
           AND {exists_sql}
-          {where_extra}
           {cliente_where}
         ORDER BY
-          v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
-          v."Sku" ASC,
-          v."Descripción del Producto" ASC
+          {_tabla_ux_sort_key_sql("v")}
         LIMIT :limit OFFSET :offset
     """, {
         "rutero": rutero,
@@ -1158,45 +1757,10 @@ def get_tabla_ux_page(
         "limit": int(page_size),
         "offset": (page - 1) * int(page_size),
         **extra,
-        **p2,
         **cliente_params,
     })
 
 
-def get_tabla_ux_paginada(
-    rutero: str,
-    reponedor: str,
-    cod_rt: str,
-    marcas: list[str] | None = None,
-    page: int = 1,
-    page_size: int = 25,
-    foco: str = "Todo",
-    search: str = "",
-    modalidad: str | None = None,
-) -> tuple[pd.DataFrame, int]:
-    total = get_tabla_ux_total(
-        rutero=rutero,
-        reponedor=reponedor,
-        cod_rt=cod_rt,
-        marcas=marcas,
-        foco=foco,
-        search=search,
-        modalidad=modalidad,
-    )
-    df = get_tabla_ux_page(
-        rutero=rutero,
-        reponedor=reponedor,
-        cod_rt=cod_rt,
-        marcas=marcas,
-        page=page,
-        page_size=page_size,
-        foco=foco,
-        search=search,
-        modalidad=modalidad,
-    )
-    return df, int(total or 0)
-
-
 @st.cache_data(ttl=QDF_TTL, show_spinner=False)
 def get_tabla_ux_export(
     rutero: str,
@@ -1208,33 +1772,21 @@ def get_tabla_ux_export(
     modalidad: str | None = None,
     cliente: str | None = None,
 ) -> pd.DataFrame:
-    exists_sql, extra = _rr_scope_exists("v", modalidad=modalidad)
-    where_extra, p2 = _build_result_filters(marcas, search, foco, alias="v")
-    cliente_where, cliente_params = _build_local_cliente_filter(cliente, alias="v")
+    where_sql, params = _tabla_ux_rr_where(
+        rutero, reponedor, cod_rt, marcas, foco, search, modalidad, cliente
+    )
     return qdf(f"""
         SELECT
           v.fecha,
           v."MARCA", v."Sku", v."Descripción del Producto",
           v."Stock", v."Venta(+7)", v."NEGATIVO", v."RIESGO DE QUIEBRE", v."OTROS"
         FROM {RESULT_VIEW} v
-        WHERE v.cod_rt = :cod_rt
-          AND {exists_sql}
-          {where_extra}
-          {cliente_where}
+        {where_sql}
         ORDER BY
           v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
           v."Sku" ASC,
           v."Descripción del Producto" ASC
-    """, {
-        "rutero": rutero,
-        "reponedor": reponedor,
-        "cod_rt": cod_rt,
-        **extra,
-        **p2,
-        **cliente_params,
-    })
+    """, params, stream=True)
 
 
 def _scope_tipo_norm(value: str | None) -> str | None:
@@ -1613,8 +2165,7 @@ def get_marcas_home_global() -> list[str]:
         WHERE NULLIF(TRIM(COALESCE(marca, '')), '') IS NOT NULL
         ORDER BY marca
     """
-    df = _selector_df("get_marcas_home_global", sql)
-    return df["marca"].astype(str).tolist() if df is not None and not df.empty else []
+    return _selector_values("get_marcas_home_global", sql, column="marca")
 
 
 def get_clientes_home_scope(marca: str | None = None) -> list[str]:
@@ -1635,8 +2186,7 @@ def get_clientes_home_scope(marca: str | None = None) -> list[str]:
         {where_extra}
         ORDER BY cliente
     """
-    df = _selector_df("get_clientes_home_scope", sql, params)
-    return df["cliente"].astype(str).tolist() if df is not None and not df.empty else []
+    return _selector_values("get_clientes_home_scope", sql, params, column="cliente")
 
 
 def get_responsables_home_scope(
@@ -1666,8 +2216,7 @@ def get_responsables_home_scope(
         {where_extra}
         ORDER BY responsable
     """
-    df = _selector_df("get_responsables_home_scope", sql, params)
-    return df["responsable"].astype(str).tolist() if df is not None and not df.empty else []
+    return _selector_values("get_responsables_home_scope", sql, params, column="responsable")
 
 
 def get_rr_people_scope(
@@ -2656,12 +3205,10 @@ def get_export_inventario_local(
         ORDER BY
           COALESCE(rr_ctx.local_nombre, CAST(v.cod_rt AS TEXT)) ASC,
           v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
           v."Sku" ASC,
           v."Descripción del Producto" ASC
     """
-    return qdf(sql, {"cod_rt": cod_rt, **cliente_params})
+    return qdf(sql, {"cod_rt": cod_rt, **cliente_params}, stream=True)
 
 
 @st.cache_data(ttl=QDF_TTL, show_spinner=False)
@@ -2754,8 +3301,6 @@ def get_export_inventario_mercaderista_local(
         ORDER BY
           COALESCE(rr_ctx.local_nombre, CAST(v.cod_rt AS TEXT)) ASC,
           v."MARCA" ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END ASC,
-          CASE WHEN v."Sku" ~ '^[0-9]+$' THEN (v."Sku")::bigint END ASC NULLS LAST,
           v."Sku" ASC,
           v."Descripción del Producto" ASC
     """
@@ -2765,7 +3310,7 @@ def get_export_inventario_mercaderista_local(
         "reponedor": reponedor,
         **modalidad_params,
         **cliente_params,
-    })
+    }, stream=True)
 
 
 
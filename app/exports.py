@@ -1,17 +1,36 @@
 # app/exports.py
 import io
+import os
 import re
+from datetime import date, datetime
 from typing import Any
 
+import numpy as np
 import pandas as pd
 from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.utils import get_column_letter
 from reportlab.lib.pagesizes import A4, A3, landscape
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
+from reportlab.platypus import (
+    BaseDocTemplate,
+    Frame,
+    LongTable,
+    PageTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+)
 from reportlab.lib.units import cm
 
+try:
+    import xlsxwriter  # type: ignore
+except Exception:
+    xlsxwriter = None  # noqa
+
+# Par: mantiene la alternancia de ROWBACKGROUNDS entre bloques.
+PDF_TABLE_CHUNK_ROWS = max(2, int(os.getenv("PDF_TABLE_CHUNK_ROWS", "200")) // 2 * 2)
 
 EXPORT_COLS = [
     "Fecha stock",
@@ -228,9 +247,35 @@ def build_export_df(df_ux: pd.DataFrame) -> pd.DataFrame:
     return df[EXPORT_COLS]
 
 
-def _sorted_for_export(df_in: pd.DataFrame) -> pd.DataFrame:
+def _sku_sort_keys(sku: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    # Mismo contrato que el ORDER BY de pantalla / sql/19: SKU numérico = sólo dígitos, hasta 18.
+    # Clasificación vectorizada en C (np.char) sobre el frame ya cacheado, sin regex por fila.
+    arr = sku.to_numpy(dtype=str)
+    is_num = np.char.isdecimal(arr) & (np.char.str_len(arr) <= 18)
+    # isdecimal también acepta dígitos Unicode ('١٢'); el SQL sólo [0-9]: exige ASCII (bytes == chars).
+    is_num &= np.char.str_len(np.char.encode(arr, "utf-8")) == np.char.str_len(arr)
+    sku_num = np.where(is_num, arr, "0").astype(np.int64)
+    return (~is_num).astype(np.int8), sku_num
+
+
+def _export_sort_cols(columns) -> list[str]:
+    cols = set(columns)
+    if "FOCO PRINCIPAL" in cols and ({"CLIENTE", "COD_RT", "LOCAL"} & cols):
+        return [
+            "CLIENTE", "COD_RT", "LOCAL", "RUTERO", "REPONEDOR",
+            "MARCA", "FOCO PRINCIPAL", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"
+        ]
+    if "FOCO PRINCIPAL" in cols:
+        return ["MARCA", "FOCO PRINCIPAL", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"]
+    return ["MARCA", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"]
+
+
+def _sorted_for_export(df_in: pd.DataFrame, presorted: bool = False) -> pd.DataFrame:
+    # presorted=True: el frame viene de build_focus_export_df (ya pasó por aquí); no se reordena.
     if df_in is None or df_in.empty:
         return df_in
+    if presorted:
+        return df_in.copy()
 
     df = df_in.copy()
 
@@ -245,29 +290,12 @@ def _sorted_for_export(df_in: pd.DataFrame) -> pd.DataFrame:
         if c in df.columns:
             df[c] = df[c].astype(str)
 
-    sku_num = pd.to_numeric(df["Sku"], errors="coerce")
-    df["_sku_is_text"] = sku_num.isna().astype(int)
-    df["_sku_num"] = sku_num.fillna(0)
-
-    if "FOCO PRINCIPAL" in df.columns and ({"CLIENTE", "COD_RT", "LOCAL"} & set(df.columns)):
-        if "CLIENTE" not in df.columns:
-            df["CLIENTE"] = ""
-        if "COD_RT" not in df.columns:
-            df["COD_RT"] = ""
-        if "LOCAL" not in df.columns:
-            df["LOCAL"] = ""
-        if "RUTERO" not in df.columns:
-            df["RUTERO"] = ""
-        if "REPONEDOR" not in df.columns:
-            df["REPONEDOR"] = ""
-        sort_cols = [
-            "CLIENTE", "COD_RT", "LOCAL", "RUTERO", "REPONEDOR",
-            "MARCA", "FOCO PRINCIPAL", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"
-        ]
-    elif "FOCO PRINCIPAL" in df.columns:
-        sort_cols = ["MARCA", "FOCO PRINCIPAL", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"]
-    else:
-        sort_cols = ["MARCA", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"]
+    df["_sku_is_text"], df["_sku_num"] = _sku_sort_keys(df["Sku"])
+
+    sort_cols = _export_sort_cols(df.columns)
+    for c in sort_cols:
+        if c not in df.columns:
+            df[c] = ""
 
     df = df.sort_values(
         by=sort_cols,
@@ -278,23 +306,25 @@ def _sorted_for_export(df_in: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def _sorted_inventory_standard_export(df_in: pd.DataFrame) -> pd.DataFrame:
+def _sorted_inventory_standard_export(df_in: pd.DataFrame, presorted: bool = False) -> pd.DataFrame:
+    # presorted=True: el frame viene de build_inventory_cliente_export_df; no se reordena.
     if df_in is None or df_in.empty:
         return df_in
+    if presorted:
+        return df_in.copy()
 
+    sort_cols = ["LOCAL", "CLIENTE", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"]
     df = df_in.copy()
     for c in ["LOCAL", "CLIENTE", "Sku", "Descripción del Producto"]:
         if c not in df.columns:
             df[c] = ""
         df[c] = df[c].astype(str)
 
-    sku_num = pd.to_numeric(df["Sku"], errors="coerce")
-    df["_sku_is_text"] = sku_num.isna().astype(int)
-    df["_sku_num"] = sku_num.fillna(0)
+    df["_sku_is_text"], df["_sku_num"] = _sku_sort_keys(df["Sku"])
 
     df = df.sort_values(
-        by=["LOCAL", "CLIENTE", "_sku_is_text", "_sku_num", "Sku", "Descripción del Producto"],
-        ascending=[True, True, True, True, True, True],
+        by=sort_cols,
+        ascending=[True] * len(sort_cols),
         kind="mergesort",
     ).drop(columns=["_sku_is_text", "_sku_num"])
 
@@ -1127,14 +1157,80 @@ def build_control_gestion_v2_workbook(
     return out.getvalue()
 
 
-def export_excel_generic(sheet_name: str, df_export: pd.DataFrame) -> bytes:
+def _xlsx_cell_value(v):
+    if isinstance(v, str) and v == "":
+        return None
+    # None / NaN / NaT / pd.NA (columnas Int64, boolean, string). Sólo escalares: pd.isna de una
+    # lista devuelve un array.
+    if pd.api.types.is_scalar(v) and pd.isna(v):
+        return None
+    if isinstance(v, pd.Timestamp):
+        return v.to_pydatetime()
+    if hasattr(v, "item") and not isinstance(v, (str, bytes)):
+        try:
+            return v.item()
+        except Exception:
+            return v
+    return v
+
+
+def _write_xlsx_streaming(out: io.BytesIO, sheet_name: str, df_export: pd.DataFrame) -> None:
+    # constant_memory escribe fila a fila y libera cada fila al pasar a la siguiente;
+    # pandas.to_excel emite por columna, por eso las filas se escriben aquí directo.
+    columns = [str(c) for c in df_export.columns]
+
+    # Mismo criterio de ancho que la ruta openpyxl: header + primeras 199 filas (celdas vacías
+    # no cuentan). Por columna y vectorizado en vez de celda a celda.
+    head = df_export.head(199)
+    widths = []
+    for i, c in enumerate(columns):
+        col = head.iloc[:, i]
+        col = col[col.notna() & col.ne("")]
+        widths.append(max(len(c), int(col.astype(str).str.len().max()) if len(col) else 0))
+
+    wb = xlsxwriter.Workbook(out, {"constant_memory": True, "strings_to_numbers": False, "strings_to_urls": False})
+    ws = wb.add_worksheet(sheet_name)
+    # Mismo estilo de header que pandas.to_excel.
+    header_fmt = wb.add_format({"bold": True, "border": 1, "align": "center", "valign": "top"})
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd"})
+    datetime_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+    for i, width in enumerate(widths):
+        ws.set_column(i, i, min(max(10, width + 2), 45))
+    ws.freeze_panes(1, 0)
+
+    ws.write_row(0, 0, columns, header_fmt)
+    n = 0
+    for n, row in enumerate(df_export.itertuples(index=False, name=None), start=1):
+        for i, v in enumerate(row):
+            v = _xlsx_cell_value(v)
+            if v is None:
+                continue
+            if isinstance(v, str):
+                ws.write_string(n, i, v)
+            elif isinstance(v, datetime):
+                ws.write_datetime(n, i, v.replace(tzinfo=None), datetime_fmt)
+            elif isinstance(v, date):
+                ws.write_datetime(n, i, v, date_fmt)
+            else:
+                ws.write(n, i, v)
+
+    if columns:
+        ws.autofilter(0, 0, n, len(columns) - 1)
+    wb.close()
+
+
+def export_excel_generic(sheet_name: str, df_export: pd.DataFrame, presorted: bool = False) -> bytes:
     out = io.BytesIO()
     safe_sheet = str(sheet_name or "DATA")[:31]
     df_export = _coalesce_duplicate_rr_columns(df_export)
     if list(df_export.columns) == INVENTORY_STANDARD_EXPORT_COLS:
-        df_export = _sorted_inventory_standard_export(df_export)
+        df_export = _sorted_inventory_standard_export(df_export, presorted=presorted)
     else:
-        df_export = _sorted_for_export(df_export)
+        df_export = _sorted_for_export(df_export, presorted=presorted)
+
+    if xlsxwriter is not None:
+        _write_xlsx_streaming(out, safe_sheet, df_export)
+        return out.getvalue()
 
     with pd.ExcelWriter(out, engine="openpyxl") as writer:
         df_export.to_excel(writer, index=False, sheet_name=safe_sheet)
@@ -1158,17 +1254,101 @@ def export_excel_one_sheet(cod_rt: str, df_export: pd.DataFrame) -> bytes:
     return export_excel_generic(str(cod_rt), df_export)
 
 
-def export_pdf_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
-    out = io.BytesIO()
-    doc = SimpleDocTemplate(
+def _pdf_header_style(style: list) -> list:
+    # Comandos que tocan la fila 0 (encabezado), para la tabla de una fila que dibuja la página.
+    return [cmd for cmd in style if cmd[1][1] == 0]
+
+
+def _pdf_body_style(style: list) -> list:
+    # Bloques sin encabezado: se descartan los comandos sólo de fila 0 y los que parten en la fila 1
+    # pasan a la 0.
+    body = []
+    for name, (c0, r0), (c1, r1), *rest in style:
+        if r0 == 0 and r1 == 0:
+            continue
+        if r0 == 1:
+            r0 = 0
+        body.append((name, (c0, r0), (c1, r1), *rest))
+    return body
+
+
+def _pdf_table_flowables(header_row: list, rows, col_widths: list[float], style: list) -> list:
+    # ReportLab vuelve a partir la tabla restante en cada salto de página (costo cuadrático en filas);
+    # bloques de PDF_TABLE_CHUNK_ROWS mantienen el build lineal. Sólo el primer bloque lleva la fila de
+    # encabezado; en las páginas siguientes lo dibuja la plantilla (_pdf_doc_with_page_headers).
+    tables = []
+    chunk: list = []
+    body_style = _pdf_body_style(style)
+
+    def _flush() -> None:
+        if tables:
+            table = LongTable(chunk, colWidths=col_widths, repeatRows=0)
+            table.setStyle(TableStyle(body_style))
+        else:
+            table = LongTable([header_row] + chunk, colWidths=col_widths, repeatRows=0)
+            table.setStyle(TableStyle(style))
+        tables.append(table)
+
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= PDF_TABLE_CHUNK_ROWS:
+            _flush()
+            chunk = []
+    if chunk or not tables:
+        _flush()
+    return tables
+
+
+def _pdf_doc_with_page_headers(
+    out,
+    *,
+    pagesize,
+    margin: float,
+    header_row: list,
+    col_widths: list[float],
+    style: list,
+) -> BaseDocTemplate:
+    # Primera página: frame completo (títulos + tabla con su encabezado). Siguientes: el frame se acorta
+    # y el encabezado se dibuja arriba, alineado con la tabla centrada del frame.
+    doc = BaseDocTemplate(
         out,
-        pagesize=landscape(A4),
-        leftMargin=1.0 * cm,
-        rightMargin=1.0 * cm,
-        topMargin=1.0 * cm,
-        bottomMargin=1.0 * cm,
+        pagesize=pagesize,
+        leftMargin=margin,
+        rightMargin=margin,
+        topMargin=margin,
+        bottomMargin=margin,
+    )
+    header = Table([header_row], colWidths=col_widths)
+    header.setStyle(TableStyle(_pdf_header_style(style)))
+    pad = 6  # padding por defecto de Frame
+    avail_w = doc.width - 2 * pad
+    header_w, header_h = header.wrap(avail_w, doc.height)
+    header_x = doc.leftMargin + pad + (avail_w - header_w) / 2.0
+    header_y = doc.bottomMargin + doc.height - pad - header_h
+
+    def _draw_header(canvas, _doc) -> None:
+        canvas.saveState()
+        header.drawOn(canvas, header_x, header_y)
+        canvas.restoreState()
+
+    first = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id="first")
+    later = Frame(
+        doc.leftMargin,
+        doc.bottomMargin,
+        doc.width,
+        doc.height - pad - header_h,
+        topPadding=0,
+        id="later",
     )
+    doc.addPageTemplates([
+        PageTemplate(id="first", frames=[first], autoNextPageTemplate="later"),
+        PageTemplate(id="later", frames=[later], onPage=_draw_header),
+    ])
+    return doc
+
 
+def export_pdf_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
+    out = io.BytesIO()
     styles = getSampleStyleSheet()
     body = ParagraphStyle(
         "BodySmall",
@@ -1188,16 +1368,18 @@ def export_pdf_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
         df["Descripción del Producto"] = ""
     df["Descripción del Producto"] = df["Descripción del Producto"].astype(str)
 
-    data = [EXPORT_COLS]
-    for _, r in df.iterrows():
-        row = []
-        for c in EXPORT_COLS:
-            v = r.get(c, "")
-            if c == "Descripción del Producto":
-                row.append(Paragraph(str(v), body))
-            else:
-                row.append(str(v))
-        data.append(row)
+    # Columnar: una lista por columna (tolist + str conserva el texto que daba iterrows) y un
+    # único zip; sólo la descripción se envuelve en Paragraph.
+    n_rows = len(df)
+    cols_data = []
+    for c in EXPORT_COLS:
+        if c == "Descripción del Producto":
+            cols_data.append([Paragraph(v, body) for v in df[c].tolist()])
+        elif c in df.columns:
+            cols_data.append([str(v) for v in df[c].tolist()])
+        else:
+            cols_data.append([""] * n_rows)
+    rows = (list(row) for row in zip(*cols_data))
 
     col_widths = [
         2.4 * cm,
@@ -1211,8 +1393,7 @@ def export_pdf_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
         2.0 * cm,
     ]
 
-    table = LongTable(data, colWidths=col_widths, repeatRows=1)
-    table.setStyle(TableStyle([
+    style = [
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E6E6E6")),
         ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
         ("FONTSIZE", (0, 0), (-1, 0), 8),
@@ -1228,9 +1409,18 @@ def export_pdf_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
         ("RIGHTPADDING", (0, 0), (-1, -1), 4),
         ("TOPPADDING", (0, 0), (-1, -1), 3),
         ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    ]
 
-    story.append(table)
+    header_row = list(EXPORT_COLS)
+    doc = _pdf_doc_with_page_headers(
+        out,
+        pagesize=landscape(A4),
+        margin=1.0 * cm,
+        header_row=header_row,
+        col_widths=col_widths,
+        style=style,
+    )
+    story.extend(_pdf_table_flowables(header_row, rows, col_widths, style))
     doc.build(story)
     return out.getvalue()
 
@@ -1273,18 +1463,14 @@ def _pdf_column_widths(columns: list[str]) -> tuple[list[float], object]:
     return [w * cm for w in widths_cm], pagesize
 
 
-def export_pdf_generic(title_lines: list[str], df_export: pd.DataFrame, columns: list[str]) -> bytes:
+def export_pdf_generic(
+    title_lines: list[str],
+    df_export: pd.DataFrame,
+    columns: list[str],
+    presorted: bool = False,
+) -> bytes:
     out = io.BytesIO()
     col_widths, pagesize = _pdf_column_widths(columns)
-    doc = SimpleDocTemplate(
-        out,
-        pagesize=pagesize,
-        leftMargin=0.8 * cm,
-        rightMargin=0.8 * cm,
-        topMargin=0.8 * cm,
-        bottomMargin=0.8 * cm,
-    )
-
     styles = getSampleStyleSheet()
     body = ParagraphStyle(
         "BodySmallWrap",
@@ -1337,24 +1523,25 @@ def export_pdf_generic(title_lines: list[str], df_export: pd.DataFrame, columns:
         story.append(Paragraph(line, styles["Heading4"]))
     story.append(Spacer(1, 8))
 
-    df = _sorted_for_export(df_export)
+    df = _sorted_for_export(df_export, presorted=presorted)
     for c in columns:
         if c not in df.columns:
             df[c] = ""
     df = df[columns].copy()
 
-    data = [[Paragraph(str(col), header) for col in columns]]
-    for _, r in df.iterrows():
-        row = []
-        for c in columns:
-            v = r.get(c, "")
-            if c in wrap_cols:
-                row.append(Paragraph(str(v), body))
-            else:
-                row.append(str(v))
-        data.append(row)
+    header_row = [Paragraph(str(col), header) for col in columns]
+
+    def _rows():
+        for _, r in df.iterrows():
+            row = []
+            for c in columns:
+                v = r.get(c, "")
+                if c in wrap_cols:
+                    row.append(Paragraph(str(v), body))
+                else:
+                    row.append(str(v))
+            yield row
 
-    table = LongTable(data, colWidths=col_widths, repeatRows=1)
     style = [
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E6E6E6")),
         ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#CFCFCF")),
@@ -1374,11 +1561,18 @@ def export_pdf_generic(title_lines: list[str], df_export: pd.DataFrame, columns:
         else:
             style.append(("ALIGN", (idx, 1), (idx, -1), "LEFT"))
 
-    table.setStyle(TableStyle(style))
-    story.append(table)
+    doc = _pdf_doc_with_page_headers(
+        out,
+        pagesize=pagesize,
+        margin=0.8 * cm,
+        header_row=header_row,
+        col_widths=col_widths,
+        style=style,
+    )
+    story.extend(_pdf_table_flowables(header_row, _rows(), col_widths, style))
     doc.build(story)
     return out.getvalue()
 
 
-def export_pdf_focus_table(title_lines: list[str], df_export: pd.DataFrame) -> bytes:
-    return export_pdf_generic(title_lines, df_export, FOCUS_EXPORT_COLS)
+def export_pdf_focus_table(title_lines: list[str], df_export: pd.DataFrame, presorted: bool = False) -> bytes:
+    return export_pdf_generic(title_lines, df_export, FOCUS_EXPORT_COLS, presorted=presorted)
@@ -284,6 +284,7 @@ def _render_cliente_inventory_export(
     inventory_excel = export_excel_generic(
         f"CLIENTE_{cliente_token}_{resp_tipo_token}_{responsable_token}",
         df_inventory_cliente,
+        presorted=True,
     )
     st.download_button(
         "Descargar inventario",
@@ -1,6 +1,7 @@
 import math
 import os
 import traceback
+from functools import partial
 
 import pandas as pd
 import streamlit as st
@@ -18,6 +19,10 @@ from app.services import stock as stock_service
 
 
 def _qp_get(key: str, default: str = "") -> str:
+    # Home.py deja el snapshot del rerun; sin él se lee st.query_params directo.
+    snap = st.session_state.get("_qp_snapshot")
+    if snap is not None:
+        return snap.get(key, default)
     try:
         qp = st.query_params
         v = qp.get(key, default)
@@ -30,6 +35,63 @@ def _qp_get(key: str, default: str = "") -> str:
         return v[0] if isinstance(v, list) and v else default
 
 
+def _index_by_label(df: pd.DataFrame, left: str, right: str) -> pd.DataFrame:
+    # Índice hash por label: lookup O(1) del selectbox en vez de máscara booleana por rerun.
+    out = df.copy()
+    out["label"] = [f"{a} — {b}" for a, b in zip(out[left].astype(str), out[right].astype(str))]
+    out = out.drop_duplicates("label", keep="first")
+    return out.set_index("label", drop=False)
+
+
+EXPORT_CACHE_TTL = int(os.getenv("QDF_TTL", "180"))
+
+
+def _inventory_export_df(df_export_raw: pd.DataFrame) -> pd.DataFrame:
+    df_export = build_inventory_cliente_export_df(df_export_raw)
+    if "GESTOR" in df_export_raw.columns:
+        gestor_map = df_export_raw[["COD_RT", "LOCAL", "CLIENTE", "MARCA", "Sku", "GESTOR"]].copy()
+        gestor_map["GESTOR"] = gestor_map["GESTOR"].astype(str).replace({"nan": "", "None": ""}).fillna("")
+        gestor_map = gestor_map.drop_duplicates()
+        df_export = df_export.merge(
+            gestor_map,
+            on=["COD_RT", "LOCAL", "CLIENTE", "MARCA", "Sku"],
+            how="left",
+        )
+        if "GESTOR" in df_export.columns:
+            cols = [c for c in df_export.columns if c != "GESTOR"]
+            insert_at = cols.index("CLIENTE") + 1 if "CLIENTE" in cols else 4
+            cols = cols[:insert_at] + ["GESTOR"] + cols[insert_at:]
+            df_export = df_export[cols]
+    return df_export
+
+
+@st.cache_data(ttl=EXPORT_CACHE_TTL, show_spinner=False, max_entries=64)
+def _inventory_export_excel_cached(
+    data_version: str,
+    modo: str,
+    cod_rt: str,
+    modalidad: str,
+    rutero: str,
+    reponedor: str,
+    cliente: str | None,
+) -> bytes | None:
+    # Query + build + xlsx en una sola entrada: sobrevive a _invalidate_runtime_cache y entre sesiones.
+    if modo == "LOCAL":
+        df_export_raw = stock_service.get_export_inventario_local(cod_rt, cliente=cliente)
+    else:
+        df_export_raw = stock_service.get_export_inventario_mercaderista_local(
+            cod_rt,
+            modalidad,
+            rutero,
+            reponedor,
+            cliente=cliente,
+        )
+    if df_export_raw is None or df_export_raw.empty:
+        return None
+    # El merge left de GESTOR conserva el orden de build_inventory_cliente_export_df.
+    return export_excel_generic(f"INVENTARIO_{cod_rt}", _inventory_export_df(df_export_raw), presorted=True)
+
+
 def render_reposicion(
     *,
     modo,
@@ -120,11 +182,11 @@ def render_reposicion(
             st.warning("No hay locales para mostrar.")
             st.stop()
 
-        locs = locs.copy()
-        locs["label"] = locs["cod_rt"].astype(str) + " — " + locs["nombre_local"].astype(str)
+        locs = _index_by_label(locs, "cod_rt", "nombre_local")
         loc_labels = [LOCAL_PLACEHOLDER] + locs["label"].tolist()
 
-        if st.session_state.get("sel_local_label", "") not in loc_labels:
+        sel_local = st.session_state.get("sel_local_label", "")
+        if sel_local != LOCAL_PLACEHOLDER and sel_local not in locs.index:
             if qp_cod_rt:
                 hit = locs.loc[locs["cod_rt"].astype(str) == qp_cod_rt, "label"]
                 st.session_state["sel_local_label"] = hit.iloc[0] if not hit.empty else LOCAL_PLACEHOLDER
@@ -143,13 +205,12 @@ def render_reposicion(
             st.info("Selecciona un LOCAL para cargar indicadores, clientes y tabla.")
             st.stop()
 
-        hit_loc = locs.loc[locs["label"] == st.session_state["sel_local_label"]]
-        if hit_loc.empty:
+        if st.session_state["sel_local_label"] not in locs.index:
             _dbg("ERR local selection invalid", sel=st.session_state["sel_local_label"])
             st.error("El local seleccionado ya no está disponible. Vuelve a seleccionar.")
             st.stop()
 
-        row_loc = hit_loc.iloc[0]
+        row_loc = locs.loc[st.session_state["sel_local_label"]]
         cod_rt = str(row_loc["cod_rt"])
         _dbg("LOCAL selected", modo=modo, cod_rt=cod_rt)
         _dbg_block()
@@ -232,11 +293,11 @@ def render_reposicion(
                 st.stop()
 
             if rr_df is not None and not rr_df.empty:
-                rr_df = rr_df.copy()
-                rr_df["label"] = rr_df["rutero"].astype(str) + " — " + rr_df["reponedor"].astype(str)
+                rr_df = _index_by_label(rr_df, "rutero", "reponedor")
                 rr_opts = [RR_PLACEHOLDER] + rr_df["label"].tolist()
 
-        if st.session_state.get("sel_rr_label", "") not in rr_opts:
+        sel_rr = st.session_state.get("sel_rr_label", "")
+        if sel_rr != RR_PLACEHOLDER and (rr_df is None or rr_df.empty or sel_rr not in rr_df.index):
             if rr_df is not None and not rr_df.empty and qp_rutero and qp_reponedor:
                 hit_rr = rr_df[
                     (rr_df["rutero"].astype(str) == qp_rutero)
@@ -262,13 +323,12 @@ def render_reposicion(
             st.info("Selecciona un RUTERO—REPONEDOR para cargar locales.")
             st.stop()
 
-        hit_rr = rr_df.loc[rr_df["label"] == st.session_state["sel_rr_label"]] if rr_df is not None else None
-        if hit_rr is None or hit_rr.empty:
+        if rr_df is None or rr_df.empty or st.session_state["sel_rr_label"] not in rr_df.index:
             _dbg("ERR rr selection invalid", sel=st.session_state["sel_rr_label"])
             st.error("La selección de RUTERO—REPONEDOR ya no está disponible. Vuelve a seleccionar.")
             st.stop()
 
-        row_rr = hit_rr.iloc[0]
+        row_rr = rr_df.loc[st.session_state["sel_rr_label"]]
         rutero = str(row_rr["rutero"])
         reponedor = str(row_rr["reponedor"])
         _dbg("RR selected", modalidad=modalidad_sel, rutero=rutero, reponedor=reponedor)
@@ -292,11 +352,11 @@ def render_reposicion(
             st.warning("No hay locales para la combinación Modalidad + Rutero—Reponedor.")
             st.stop()
 
-        locs = locs.copy()
-        locs["label"] = locs["cod_rt"].astype(str) + " — " + locs["nombre_local"].astype(str)
+        locs = _index_by_label(locs, "cod_rt", "nombre_local")
         loc_labels = [LOCAL_PLACEHOLDER] + locs["label"].tolist()
 
-        if st.session_state.get("sel_local_label", "") not in loc_labels:
+        sel_local = st.session_state.get("sel_local_label", "")
+        if sel_local != LOCAL_PLACEHOLDER and sel_local not in locs.index:
             if qp_cod_rt:
                 hit = locs.loc[locs["cod_rt"].astype(str) == qp_cod_rt, "label"]
                 st.session_state["sel_local_label"] = hit.iloc[0] if not hit.empty else LOCAL_PLACEHOLDER
@@ -314,13 +374,12 @@ def render_reposicion(
             st.info("Selecciona un LOCAL para cargar clientes, indicadores y tabla.")
             st.stop()
 
-        hit_loc = locs.loc[locs["label"] == st.session_state["sel_local_label"]]
-        if hit_loc.empty:
+        if st.session_state["sel_local_label"] not in locs.index:
             _dbg("ERR local selection invalid", sel=st.session_state["sel_local_label"])
             st.error("El local seleccionado ya no está disponible. Vuelve a seleccionar.")
             st.stop()
 
-        row_loc = hit_loc.iloc[0]
+        row_loc = locs.loc[st.session_state["sel_local_label"]]
         cod_rt = str(row_loc["cod_rt"])
         _dbg("LOCAL selected", modo=modo, modalidad=modalidad_sel, rutero=rutero, reponedor=reponedor, cod_rt=cod_rt)
         _dbg_block()
@@ -437,9 +496,13 @@ def render_reposicion(
             _dbg("FAIL marcas", err=repr(e))
             marcas_disponibles = []
 
-        st.session_state.setdefault("sel_marcas", [])
-        mset = set(marcas_disponibles)
-        st.session_state["sel_marcas"] = [m for m in (st.session_state.get("sel_marcas") or []) if m in mset]
+        sel_marcas = st.session_state.setdefault("sel_marcas", []) or []
+        if sel_marcas:
+            # Sin selección no hay nada que sanear; sólo se reescribe el state si algo sobra.
+            mset = frozenset(marcas_disponibles)
+            kept = [m for m in sel_marcas if m in mset]
+            if len(kept) != len(sel_marcas):
+                st.session_state["sel_marcas"] = kept
 
         marcas = list(st.session_state.get("applied_marcas", []) or [])
         foco_ap = _normalize_focos_ui(st.session_state.get("applied_foco", []))
@@ -453,24 +516,46 @@ def render_reposicion(
         kpis_key = (dv, modo, modalidad_sel, rutero, reponedor, cod_rt, cliente_sel or LOCAL_CLIENTE_ALL)
 
     kpis_row = st.session_state.get("_kpis_row")
+    page_size = 25
+    st.session_state.setdefault("page", 1)
 
     if st.session_state.get("_kpis_key") != kpis_key or kpis_row is None:
         try:
-            with _timed("PAGE kpis", tag="PAGE"):
-                kpis = stock_service.get_kpis(
-                    modo=modo,
-                    cod_rt=cod_rt,
-                    marcas=marcas,
-                    rutero=rutero,
-                    reponedor=reponedor,
-                    modalidad=modalidad_sel,
-                    cliente=cliente_sel,
-                )
+            kpis_row = None
+            if modo in {"LOCAL", "MERCADERISTA"}:
+                # Sin filtros de tabla: KPIs y página actual salen del mismo query.
+                page_now = int(st.session_state.get("page", 1) or 1)
+                with _timed("PAGE kpis_page", tag="PAGE"):
+                    kpis_row, df_page_kpis = stock_service.get_kpis_and_page(
+                        modo=modo,
+                        cod_rt=cod_rt,
+                        page=page_now,
+                        page_size=page_size,
+                        rutero=rutero,
+                        reponedor=reponedor,
+                        modalidad=modalidad_sel,
+                        cliente=cliente_sel,
+                    )
+                if kpis_row is not None:
+                    st.session_state["_page_df_key"] = kpis_key + (page_now, page_size)
+                    st.session_state["_page_df"] = df_page_kpis
+                _dbg("KPIS+PAGE loaded", rows=0 if df_page_kpis is None else len(df_page_kpis))
+                _dbg_block()
 
-            _dbg("KPIS loaded", rows=0 if kpis is None else len(kpis))
-            _dbg_block()
+            if kpis_row is None:
+                with _timed("PAGE kpis", tag="PAGE"):
+                    kpis_row = stock_service.get_kpis_row(
+                        modo=modo,
+                        cod_rt=cod_rt,
+                        marcas=marcas,
+                        rutero=rutero,
+                        reponedor=reponedor,
+                        modalidad=modalidad_sel,
+                        cliente=cliente_sel,
+                    )
 
-            kpis_row = dict(kpis.iloc[0]) if (kpis is not None and not kpis.empty) else None
+                _dbg("KPIS loaded", rows=0 if kpis_row is None else 1)
+                _dbg_block()
             st.session_state["_kpis_key"] = kpis_key
             st.session_state["_kpis_row"] = kpis_row
         except Exception as e:
@@ -481,19 +566,33 @@ def render_reposicion(
 
     _render_kpi_cards(kpis_row)
 
-    total_skus_kpi = int((kpis_row or {}).get("total_skus") or 0)
-    fecha_stock_raw = (kpis_row or {}).get("fecha_stock")
-    fecha_stock_dt = pd.to_datetime(fecha_stock_raw, errors="coerce")
-    file_stamp = fecha_stock_dt.strftime("%Y-%m-%d") if pd.notna(fecha_stock_dt) else "Sin stock"
+    total_skus_kpi = (kpis_row or {}).get("total_skus", 0)
+    file_stamp = (kpis_row or {}).get("fecha_stock_txt") or "Sin stock"
 
     if total_skus_kpi == 0:
         st.caption("Estado: Sin stock para la combinación seleccionada.")
 
     if modo not in {"LOCAL", "MERCADERISTA"}:
         def _apply_filters():
-            st.session_state["applied_marcas"] = list(st.session_state.get("sel_marcas", []) or [])
-            st.session_state["applied_foco"] = _normalize_focos_ui(st.session_state.get("f_foco", []))
-            st.session_state["applied_search"] = (st.session_state.get("f_search", "") or "").strip()
+            new_marcas = list(st.session_state.get("sel_marcas", []) or [])
+            new_foco = _normalize_focos_ui(st.session_state.get("f_foco", []))
+            new_search = (st.session_state.get("f_search", "") or "").strip()
+            if len(new_search) < 2:
+                # El WHERE ignora búsquedas de menos de 2 caracteres.
+                new_search = ""
+
+            applied = (
+                list(st.session_state.get("applied_marcas", []) or []),
+                _normalize_focos_ui(st.session_state.get("applied_foco", [])),
+                (st.session_state.get("applied_search", "") or "").strip(),
+            )
+            if (new_marcas, new_foco, new_search) == applied:
+                _dbg("APPLY filters sin cambios", tag="CACHE")
+                return
+
+            st.session_state["applied_marcas"] = new_marcas
+            st.session_state["applied_foco"] = new_foco
+            st.session_state["applied_search"] = new_search
             st.session_state["page"] = 1
             _invalidate_runtime_cache()
             _dbg(
@@ -550,9 +649,6 @@ def render_reposicion(
         foco_ap = []
         search_ap = ""
 
-    page_size = 25
-    st.session_state.setdefault("page", 1)
-
     max_m = int(os.getenv("MAX_MARCA_FILTER", "50"))
     can_use_kpi_total = (
         len((search_ap or "").strip()) < 2
@@ -565,20 +661,20 @@ def render_reposicion(
     single_foco = foco_ap[0] if len(foco_ap) == 1 else None
 
     if modo in {"LOCAL", "MERCADERISTA"}:
-        kpi_total_rows = int(total_skus_kpi or 0)
+        kpi_total_rows = total_skus_kpi
     elif total_skus_kpi == 0:
         kpi_total_rows = 0
     elif can_use_kpi_total and len(foco_ap) <= 1:
         if not foco_ap:
-            kpi_total_rows = int(kpis_row.get("total_skus") or 0)
+            kpi_total_rows = kpis_row["total_skus"]
         elif single_foco == "Venta 0":
-            kpi_total_rows = int(kpis_row.get("venta_0") or 0)
+            kpi_total_rows = kpis_row["venta_0"]
         elif single_foco == "Negativo":
-            kpi_total_rows = int(kpis_row.get("negativos") or 0)
+            kpi_total_rows = kpis_row["negativos"]
         elif single_foco == "Quiebres":
-            kpi_total_rows = int(kpis_row.get("quiebres") or 0)
+            kpi_total_rows = kpis_row["quiebres"]
         elif single_foco == "Otros":
-            kpi_total_rows = int(kpis_row.get("otros") or 0)
+            kpi_total_rows = kpis_row["otros"]
 
     if modo == "LOCAL":
         total_key = (dv, modo, cod_rt, cliente_sel or LOCAL_CLIENTE_ALL)
@@ -623,165 +719,195 @@ def render_reposicion(
     if st.session_state["page"] < 1:
         st.session_state["page"] = 1
 
-    def _page_prev():
-        st.session_state["page"] = max(1, int(st.session_state.get("page", 1)) - 1)
-        st.session_state["page_input_ui"] = st.session_state["page"]
+    # Paginador + tabla en un fragment: cambiar de página re-ejecuta sólo este bloque,
+    # no los selectores/KPIs de arriba que ya quedaron resueltos en la corrida completa.
+    def _results_table():
+        def _page_prev():
+            st.session_state["page"] = max(1, int(st.session_state.get("page", 1)) - 1)
+            st.session_state["page_input_ui"] = st.session_state["page"]
 
-    def _page_next():
-        st.session_state["page"] = min(total_pages, int(st.session_state.get("page", 1)) + 1)
-        st.session_state["page_input_ui"] = st.session_state["page"]
+        def _page_next():
+            st.session_state["page"] = min(total_pages, int(st.session_state.get("page", 1)) + 1)
+            st.session_state["page_input_ui"] = st.session_state["page"]
 
-    def _page_from_input():
-        try:
-            new_page = int(st.session_state.get("page_input_ui", 1))
-        except Exception:
-            new_page = 1
+        def _page_from_input():
+            try:
+                new_page = int(st.session_state.get("page_input_ui", 1))
+            except Exception:
+                new_page = 1
 
-        new_page = max(1, min(total_pages, new_page))
-        st.session_state["page"] = new_page
-        st.session_state["page_input_ui"] = new_page
+            new_page = max(1, min(total_pages, new_page))
+            st.session_state["page"] = new_page
+            st.session_state["page_input_ui"] = new_page
 
-    current_page = int(st.session_state.get("page", 1))
-    if current_page < 1:
-        current_page = 1
-        st.session_state["page"] = 1
-    if current_page > total_pages:
-        current_page = total_pages
-        st.session_state["page"] = total_pages
+        current_page = int(st.session_state.get("page", 1))
+        if current_page < 1:
+            current_page = 1
+            st.session_state["page"] = 1
+        if current_page > total_pages:
+            current_page = total_pages
+            st.session_state["page"] = total_pages
 
-    if int(st.session_state.get("page_input_ui", current_page)) != current_page:
-        st.session_state["page_input_ui"] = current_page
+        if int(st.session_state.get("page_input_ui", current_page)) != current_page:
+            st.session_state["page_input_ui"] = current_page
 
-    if total_rows:
-        start = (current_page - 1) * page_size + 1
-        end = min(current_page * page_size, total_rows)
-        pager_text = f"{start}-{end} de {total_rows} registros"
-    else:
-        pager_text = "Sin filas para el filtro aplicado."
+        if total_rows:
+            start = (current_page - 1) * page_size + 1
+            end = min(current_page * page_size, total_rows)
+            pager_text = f"{start}-{end} de {total_rows} registros"
+        else:
+            pager_text = "Sin filas para el filtro aplicado."
 
-    p1, p2, p3, p4 = st.columns([0.9, 1.3, 0.9, 2.2], gap="small")
+        p1, p2, p3, p4 = st.columns([0.9, 1.3, 0.9, 2.2], gap="small")
 
-    with p1:
-        st.button(
-            "◀",
-            key="page_prev_btn",
-            disabled=(current_page <= 1),
-            on_click=_page_prev,
-            width="stretch",
-        )
+        with p1:
+            st.button(
+                "◀",
+                key="page_prev_btn",
+                disabled=(current_page <= 1),
+                on_click=_page_prev,
+                width="stretch",
+            )
 
-    with p2:
-        st.number_input(
-            "Página",
-            min_value=1,
-            max_value=max(1, total_pages),
-            step=1,
-            key="page_input_ui",
-            on_change=_page_from_input,
-            label_visibility="collapsed",
-        )
+        with p2:
+            st.number_input(
+                "Página",
+                min_value=1,
+                max_value=max(1, total_pages),
+                step=1,
+                key="page_input_ui",
+                on_change=_page_from_input,
+                label_visibility="collapsed",
+            )
 
-    with p3:
-        st.button(
-            "▶",
-            key="page_next_btn",
-            disabled=(current_page >= total_pages),
-            on_click=_page_next,
-            width="stretch",
-        )
+        with p3:
+            st.button(
+                "▶",
+                key="page_next_btn",
+                disabled=(current_page >= total_pages),
+                on_click=_page_next,
+                width="stretch",
+            )
 
-    with p4:
-        st.caption(pager_text)
+        with p4:
+            st.caption(pager_text)
+
+        # Cursores keyset por página (clave de la última fila de la página anterior), válidos
+        # mientras no cambien scope/filtros: ◀/▶ leen con range scan; un salto directo a una
+        # página sin cursor cae a OFFSET.
+        cursor_key = total_key + (page_size, tuple(marcas), tuple(foco_ap), search_ap)
+        page_cursors = st.session_state.get("_page_cursors")
+        if not isinstance(page_cursors, dict) or page_cursors.get("_key") != cursor_key:
+            page_cursors = {"_key": cursor_key}
+            st.session_state["_page_cursors"] = page_cursors
+        page_now = int(st.session_state["page"])
+
+        if total_rows == 0:
+            df_page = pd.DataFrame(columns=[
+                "MARCA", "Sku", "Descripción del Producto",
+                "Stock", "Venta(+7)", "NEGATIVO", "RIESGO DE QUIEBRE", "otros_flag"
+            ])
+            _dbg("TABLA page skipped", reason="sin_filas")
+            _dbg_block()
+        elif (
+            modo in {"LOCAL", "MERCADERISTA"}
+            and st.session_state.get("_page_df_key") == kpis_key + (int(st.session_state["page"]), page_size)
+            and st.session_state.get("_page_df") is not None
+        ):
+            df_page = st.session_state["_page_df"]
+            _dbg("TABLA page from KPIs", tag="CACHE", rows=len(df_page), page=st.session_state["page"])
+            _dbg_block()
+        else:
+            try:
+                with _timed("PAGE tabla_page", tag="PAGE"):
+                    df_page = stock_service.get_page(
+                        modo=modo,
+                        cod_rt=cod_rt,
+                        marcas=marcas,
+                        foco=foco_ap,
+                        search=search_ap,
+                        page=int(st.session_state["page"]),
+                        page_size=page_size,
+                        rutero=rutero,
+                        reponedor=reponedor,
+                        modalidad=modalidad_sel,
+                        cliente=cliente_sel,
+                        after=page_cursors.get(page_now),
+                    )
 
-    if total_rows == 0:
-        df_page = pd.DataFrame(columns=[
-            "MARCA", "Sku", "Descripción del Producto",
-            "Stock", "Venta(+7)", "NEGATIVO", "RIESGO DE QUIEBRE", "OTROS"
-        ])
-        _dbg("TABLA page skipped", reason="sin_filas")
-        _dbg_block()
-    else:
-        try:
-            with _timed("PAGE tabla_page", tag="PAGE"):
-                df_page = stock_service.get_page(
-                    modo=modo,
-                    cod_rt=cod_rt,
-                    marcas=marcas,
-                    foco=foco_ap,
-                    search=search_ap,
-                    page=int(st.session_state["page"]),
-                    page_size=page_size,
-                    rutero=rutero,
-                    reponedor=reponedor,
-                    modalidad=modalidad_sel,
-                    cliente=cliente_sel,
+                _dbg(
+                    "TABLA page loaded",
+                    rows=0 if df_page is None else len(df_page),
+                    page=st.session_state["page"],
+                    keyset=page_now in page_cursors,
                 )
+                _dbg_block()
 
-            _dbg(
-                "TABLA page loaded",
-                rows=0 if df_page is None else len(df_page),
-                page=st.session_state["page"],
-            )
-            _dbg_block()
+            except Exception as e:
+                _dbg("FAIL tabla page", err=repr(e))
+                st.error("No pude leer la tabla de stock.")
+                with st.expander("Detalles técnicos"):
+                    st.code(repr(e))
+                    if DEBUG:
+                        st.code(traceback.format_exc())
+                st.stop()
 
-        except Exception as e:
-            _dbg("FAIL tabla page", err=repr(e))
-            st.error("No pude leer la tabla de stock.")
-            with st.expander("Detalles técnicos"):
-                st.code(repr(e))
-                if DEBUG:
-                    st.code(traceback.format_exc())
-            st.stop()
+        if df_page is not None and len(df_page) >= page_size:
+            page_cursors[page_now + 1] = stock_service.get_page_cursor(df_page)
 
-    df_raw = df_page
-    _dbg("DF_RAW ready", rows=0 if df_raw is None else len(df_raw))
-    _dbg_block()
+        df_raw = df_page
+        _dbg("DF_RAW ready", rows=0 if df_raw is None else len(df_raw))
+        _dbg_block()
 
-    def _row_indicadores(r) -> str:
-        parts = []
+        def _row_indicadores(r) -> str:
+            parts = []
 
-        try:
-            v = int(r.get("Venta(+7)", 0) or 0)
-        except Exception:
-            v = 0
-        if v == 0:
-            parts.append("Venta 0: Productos sin rotación (Prioridad Alta).")
+            try:
+                v = int(r.get("Venta(+7)", 0) or 0)
+            except Exception:
+                v = 0
+            if v == 0:
+                parts.append("Venta 0: Productos sin rotación (Prioridad Alta).")
 
-        if str(r.get("NEGATIVO", "")).strip().upper() == "SI":
-            parts.append("Negativo: Realizar ajuste de inventario.")
+            if str(r.get("NEGATIVO", "")).strip().upper() == "SI":
+                parts.append("Negativo: Realizar ajuste de inventario.")
 
-        if str(r.get("RIESGO DE QUIEBRE", "")).strip().upper() == "SI":
-            parts.append("Quiebres: Solicitar empuje.")
+            if str(r.get("RIESGO DE QUIEBRE", "")).strip().upper() == "SI":
+                parts.append("Quiebres: Solicitar empuje.")
 
-        ot = str(r.get("OTROS", "") or "").strip()
-        if ot and ot.upper() not in {"NO", "N/A", "NA", "-"}:
-            parts.append("Otros: Observaciones cliente.")
+            if bool(r.get("otros_flag", False)):
+                parts.append("Otros: Observaciones cliente.")
 
-        return " · ".join(parts)
+            return " · ".join(parts)
 
-    if df_raw is not None and not df_raw.empty:
-        df_tbl = df_raw.copy()
+        if df_raw is not None and not df_raw.empty:
+            df_tbl = df_raw.copy()
 
-        if "fecha" in df_tbl.columns:
-            df_tbl["FECHA STOCK"] = pd.to_datetime(df_tbl["fecha"], errors="coerce").dt.strftime("%Y-%m-%d")
-            df_tbl["FECHA STOCK"] = df_tbl["FECHA STOCK"].fillna("")
-        else:
-            df_tbl["FECHA STOCK"] = ""
-
-        df_tbl["INDICADORES"] = df_tbl.apply(_row_indicadores, axis=1)
-        df_tbl = df_tbl.rename(columns={
-            "MARCA": "CLIENTE",
-            "Sku": "SKU",
-            "Descripción del Producto": "PRODUCTO",
-        })
-        if modo in {"LOCAL", "MERCADERISTA"} and cliente_sel:
-            df_tbl = df_tbl[["FECHA STOCK", "SKU", "PRODUCTO", "Stock", "INDICADORES"]]
+            if "fecha" in df_tbl.columns:
+                df_tbl["FECHA STOCK"] = pd.to_datetime(df_tbl["fecha"], errors="coerce").dt.strftime("%Y-%m-%d")
+                df_tbl["FECHA STOCK"] = df_tbl["FECHA STOCK"].fillna("")
+            else:
+                df_tbl["FECHA STOCK"] = ""
+
+            df_tbl["INDICADORES"] = df_tbl.apply(_row_indicadores, axis=1)
+            df_tbl = df_tbl.rename(columns={
+                "MARCA": "CLIENTE",
+                "Sku": "SKU",
+                "Descripción del Producto": "PRODUCTO",
+            })
+            if modo in {"LOCAL", "MERCADERISTA"} and cliente_sel:
+                df_tbl = df_tbl[["FECHA STOCK", "SKU", "PRODUCTO", "Stock", "INDICADORES"]]
+            else:
+                df_tbl = df_tbl[["FECHA STOCK", "CLIENTE", "SKU", "PRODUCTO", "Stock", "INDICADORES"]]
         else:
-            df_tbl = df_tbl[["FECHA STOCK", "CLIENTE", "SKU", "PRODUCTO", "Stock", "INDICADORES"]]
-    else:
-        df_tbl = df_raw
+            df_tbl = df_raw
 
-    st.dataframe(df_tbl, width="stretch", hide_index=True)
+        st.dataframe(df_tbl, width="stretch", hide_index=True)
+
+    _fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if _fragment is not None:
+        _results_table = _fragment(_results_table)
+    _results_table()
 
     if modo == "LOCAL":
         export_key = (dv, modo, cod_rt, cliente_sel or LOCAL_CLIENTE_ALL)
@@ -805,12 +931,12 @@ def render_reposicion(
         st.session_state.pop("_focus_export_pdf", None)
         st.session_state.pop("_export_scope", None)
 
-    def _prepare_export(scope: str, fmt: str):
+    def _prepare_export(scope: str, fmts: tuple[str, ...] = ("excel", "pdf")):
         if total_rows <= 0:
             return
 
-        fmt = str(fmt or "").strip().lower()
-        if fmt not in {"excel", "pdf"}:
+        fmts = tuple(f for f in (str(x or "").strip().lower() for x in fmts) if f in {"excel", "pdf"})
+        if not fmts:
             return
 
         df_export_raw = st.session_state.get("_export_raw")
@@ -855,76 +981,80 @@ def render_reposicion(
                 st.session_state["_export_df_key"] = export_key
                 st.session_state["_export_df"] = df_export
 
-            if fmt == "excel":
-                if st.session_state.get("_export_excel_key") != export_key:
-                    with _timed("EXPORT excel_bytes", tag="UI"):
-                        st.session_state["_export_excel"] = export_excel_one_sheet(cod_rt, df_export)
-                    st.session_state["_export_excel_key"] = export_key
+            jobs = {}
+            if "excel" in fmts and st.session_state.get("_export_excel_key") != export_key:
+                jobs["excel"] = (export_excel_one_sheet, (cod_rt, df_export))
+
+            if "pdf" in fmts and st.session_state.get("_export_pdf_key") != export_key:
+                if modo == "LOCAL":
+                    pdf_lines = [
+                        f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
+                        "GESTIÓN REPOSICIÓN",
+                        f"Gestión: {panel_mercaderista}  |  Modalidad: {panel_modalidad}",
+                        f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
+                        f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
+                    ]
+                else:
+                    pdf_lines = [
+                        f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
+                        "GESTIÓN REPOSICIÓN",
+                        f"Modalidad: {modalidad_sel}",
+                        f"Rutero: {rutero}  |  Reponedor: {reponedor}",
+                        f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
+                        f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
+                    ]
+
+                jobs["pdf"] = (export_pdf_table, (pdf_lines, df_export))
+
+            if jobs:
+                with _timed("EXPORT local_bytes", tag="UI"):
+                    results = {fmt: fn(*args) for fmt, (fn, args) in jobs.items()}
+                for fmt, data in results.items():
+                    st.session_state[f"_export_{fmt}"] = data
+                    st.session_state[f"_export_{fmt}_key"] = export_key
+
+        elif scope == "foco":
+            focus_key = (export_key, foco_ap)
+            df_focus = st.session_state.get("_focus_export_df")
+
+            if st.session_state.get("_focus_export_key") != focus_key or df_focus is None:
+                with _timed("EXPORT build_focus_df", tag="CACHE"):
+                    df_focus = build_focus_export_df(df_export_raw, foco=foco_ap)
+                st.session_state["_focus_export_key"] = focus_key
+                st.session_state["_focus_export_df"] = df_focus
+
+            if df_focus is not None and not df_focus.empty:
+                jobs = {}
+                if "excel" in fmts and st.session_state.get("_focus_export_excel_key") != focus_key:
+                    jobs["excel"] = (partial(export_excel_generic, presorted=True), (f"{cod_rt}_FOCO", df_focus))
 
-            elif fmt == "pdf":
-                if st.session_state.get("_export_pdf_key") != export_key:
+                if "pdf" in fmts and st.session_state.get("_focus_export_pdf_key") != focus_key:
                     if modo == "LOCAL":
-                        pdf_lines = [
+                        pdf_focus_lines = [
                             f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
-                            "GESTIÓN REPOSICIÓN",
+                            "GESTIÓN DE INDICADORES",
                             f"Gestión: {panel_mercaderista}  |  Modalidad: {panel_modalidad}",
                             f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
                             f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
                         ]
                     else:
-                        pdf_lines = [
+                        pdf_focus_lines = [
                             f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
-                            "GESTIÓN REPOSICIÓN",
+                            "GESTIÓN DE INDICADORES",
                             f"Modalidad: {modalidad_sel}",
                             f"Rutero: {rutero}  |  Reponedor: {reponedor}",
                             f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
                             f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
                         ]
 
-                    with _timed("EXPORT pdf_bytes", tag="UI"):
-                        st.session_state["_export_pdf"] = export_pdf_table(pdf_lines, df_export)
-                    st.session_state["_export_pdf_key"] = export_key
+                    jobs["pdf"] = (partial(export_pdf_focus_table, presorted=True), (pdf_focus_lines, df_focus))
 
-        elif scope == "foco":
-            focus_key = (export_key, foco_ap)
-            df_focus = st.session_state.get("_focus_export_df")
-
-            if st.session_state.get("_focus_export_key") != focus_key or df_focus is None:
-                with _timed("EXPORT build_focus_df", tag="CACHE"):
-                    df_focus = build_focus_export_df(df_export_raw, foco=foco_ap)
-                st.session_state["_focus_export_key"] = focus_key
-                st.session_state["_focus_export_df"] = df_focus
-
-            if df_focus is not None and not df_focus.empty:
-                if fmt == "excel":
-                    if st.session_state.get("_focus_export_excel_key") != focus_key:
-                        with _timed("EXPORT focus_excel_bytes", tag="UI"):
-                            st.session_state["_focus_export_excel"] = export_excel_generic(f"{cod_rt}_FOCO", df_focus)
-                        st.session_state["_focus_export_excel_key"] = focus_key
-
-                elif fmt == "pdf":
-                    if st.session_state.get("_focus_export_pdf_key") != focus_key:
-                        if modo == "LOCAL":
-                            pdf_focus_lines = [
-                                f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
-                                "GESTIÓN DE INDICADORES",
-                                f"Gestión: {panel_mercaderista}  |  Modalidad: {panel_modalidad}",
-                                f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
-                                f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
-                            ]
-                        else:
-                            pdf_focus_lines = [
-                                f"STOCK_ZERO · {cod_rt} · {nombre_local_rr}",
-                                "GESTIÓN DE INDICADORES",
-                                f"Modalidad: {modalidad_sel}",
-                                f"Rutero: {rutero}  |  Reponedor: {reponedor}",
-                                f"Fecha stock: {file_stamp}  |  Foco: {_foco_label(foco_ap)}",
-                                f"Clientes: {', '.join(marcas) if marcas else 'Todos'}  |  Búsqueda: {search_ap if search_ap else '-'}",
-                            ]
-
-                        with _timed("EXPORT focus_pdf_bytes", tag="UI"):
-                            st.session_state["_focus_export_pdf"] = export_pdf_focus_table(pdf_focus_lines, df_focus)
-                        st.session_state["_focus_export_pdf_key"] = focus_key
+                if jobs:
+                    with _timed("EXPORT focus_bytes", tag="UI"):
+                        results = {fmt: fn(*args) for fmt, (fn, args) in jobs.items()}
+                    for fmt, data in results.items():
+                        st.session_state[f"_focus_export_{fmt}"] = data
+                        st.session_state[f"_focus_export_{fmt}_key"] = focus_key
 
         st.session_state["_export_scope"] = scope
 
@@ -939,65 +1069,32 @@ def render_reposicion(
         if total_rows <= 0:
             return
 
-        df_export_raw = st.session_state.get("_export_raw")
-
-        if df_export_raw is None:
-            try:
-                if modo == "LOCAL":
-                    with _timed("EXPORT inventario_local_query", tag="CACHE"):
-                        df_export_raw = stock_service.get_export_inventario_local(
-                            cod_rt,
-                            cliente=cliente_sel,
-                        )
-                else:
-                    with _timed("EXPORT inventario_merc_query", tag="CACHE"):
-                        df_export_raw = stock_service.get_export_inventario_mercaderista_local(
-                            cod_rt,
-                            modalidad_sel,
-                            rutero,
-                            reponedor,
-                            cliente=cliente_sel,
-                        )
-                _dbg("EXPORT inventario raw loaded", rows=0 if df_export_raw is None else len(df_export_raw))
-                _dbg_block()
-                st.session_state["_export_raw"] = df_export_raw
-            except Exception as e:
-                _dbg("FAIL inventario export query", err=repr(e))
-                st.error("No pude preparar export.")
-                st.code(repr(e))
-                if DEBUG:
-                    st.code(traceback.format_exc())
-                st.stop()
-
-        if df_export_raw is None or df_export_raw.empty:
+        if st.session_state.get("_export_excel_key") == export_key:
             return
 
-        df_export = st.session_state.get("_export_df")
-        if st.session_state.get("_export_df_key") != export_key or df_export is None:
-            with _timed("EXPORT build_inventory_df", tag="CACHE"):
-                df_export = build_inventory_cliente_export_df(df_export_raw)
-                if "GESTOR" in df_export_raw.columns:
-                    gestor_map = df_export_raw[["COD_RT", "LOCAL", "CLIENTE", "MARCA", "Sku", "GESTOR"]].copy()
-                    gestor_map["GESTOR"] = gestor_map["GESTOR"].astype(str).replace({"nan": "", "None": ""}).fillna("")
-                    gestor_map = gestor_map.drop_duplicates()
-                    df_export = df_export.merge(
-                        gestor_map,
-                        on=["COD_RT", "LOCAL", "CLIENTE", "MARCA", "Sku"],
-                        how="left",
-                    )
-                    if "GESTOR" in df_export.columns:
-                        cols = [c for c in df_export.columns if c != "GESTOR"]
-                        insert_at = cols.index("CLIENTE") + 1 if "CLIENTE" in cols else 4
-                        cols = cols[:insert_at] + ["GESTOR"] + cols[insert_at:]
-                        df_export = df_export[cols]
-
-            st.session_state["_export_df_key"] = export_key
-            st.session_state["_export_df"] = df_export
+        try:
+            with _timed("EXPORT inventory_excel", tag="CACHE"):
+                excel_bytes = _inventory_export_excel_cached(
+                    dv,
+                    modo,
+                    cod_rt,
+                    modalidad_sel,
+                    rutero,
+                    reponedor,
+                    cliente_sel,
+                )
+            _dbg("EXPORT inventario ready", bytes=0 if excel_bytes is None else len(excel_bytes))
+            _dbg_block()
+        except Exception as e:
+            _dbg("FAIL inventario export query", err=repr(e))
+            st.error("No pude preparar export.")
+            st.code(repr(e))
+            if DEBUG:
+                st.code(traceback.format_exc())
+            st.stop()
 
-        if st.session_state.get("_export_excel_key") != export_key:
-            with _timed("EXPORT inventory_excel_bytes", tag="UI"):
-                st.session_state["_export_excel"] = export_excel_generic(f"INVENTARIO_{cod_rt}", st.session_state["_export_df"])
-            st.session_state["_export_excel_key"] = export_key
+        st.session_state["_export_excel_key"] = export_key
+        st.session_state["_export_excel"] = excel_bytes
 
     st.markdown("---")
 
@@ -1026,8 +1123,7 @@ def render_reposicion(
                 st.caption("Sin Excel disponible")
         else:
             with st.expander("EXPORTAR FOCO: Gestión de indicadores", expanded=False):
-                _prepare_export("foco", "excel")
-                _prepare_export("foco", "pdf")
+                _prepare_export("foco")
 
                 if st.session_state.get("_focus_export_excel") is not None:
                     st.download_button(
@@ -1054,8 +1150,7 @@ def render_reposicion(
                     st.caption("Sin PDF disponible")
 
             with st.expander("EXPORTAR LOCAL: Gestión reposición.", expanded=False):
-                _prepare_export("local", "excel")
-                _prepare_export("local", "pdf")
+                _prepare_export("local")
 
                 if st.session_state.get("_export_excel") is not None:
                     st.download_button(
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+import pandas as pd
+
 from app import db
 
+KPI_COUNT_COLUMNS = [c for c in db.KPI_COLUMNS if c != "fecha_stock"]
+
 
 def _validate_mode(modo: str) -> str:
     mode = str(modo or "").strip().upper()
@@ -81,6 +85,69 @@ def get_kpis(modo, cod_rt, marcas=None, rutero=None, reponedor=None, modalidad=N
     )
 
 
+def _as_int(v) -> int:
+    return 0 if v is None or pd.isna(v) else int(v)
+
+
+def _kpis_row(row):
+    # row: dict de q_row (get_kpis) o la primera fila de la página+KPIs ya pasada a dict.
+    # Ints nativos; la pantalla ya no castea escalares pandas uno a uno.
+    if not row:
+        return None
+    fecha = pd.to_datetime(row.get("fecha_stock"), errors="coerce")
+    out = {
+        "fecha_stock": row.get("fecha_stock"),
+        "fecha_stock_txt": fecha.strftime("%Y-%m-%d") if pd.notna(fecha) else None,
+    }
+    out.update((c, _as_int(row.get(c))) for c in KPI_COUNT_COLUMNS)
+    return out
+
+
+def get_kpis_row(modo, cod_rt, marcas=None, rutero=None, reponedor=None, modalidad=None, cliente=None):
+    return _kpis_row(get_kpis(
+        modo,
+        cod_rt,
+        marcas=marcas,
+        rutero=rutero,
+        reponedor=reponedor,
+        modalidad=modalidad,
+        cliente=cliente,
+    ))
+
+
+def get_kpis_and_page(
+    modo,
+    cod_rt,
+    page=1,
+    page_size=100,
+    rutero=None,
+    reponedor=None,
+    modalidad=None,
+    cliente=None,
+):
+    mode = _validate_mode(modo)
+    if mode == "LOCAL":
+        df = db.get_tabla_ux_page_kpis_home(
+            cod_rt=cod_rt,
+            page=page,
+            page_size=page_size,
+            cliente=cliente,
+        )
+    else:
+        df = db.get_tabla_ux_page_kpis(
+            rutero=rutero,
+            reponedor=reponedor,
+            cod_rt=cod_rt,
+            page=page,
+            page_size=page_size,
+            modalidad=modalidad,
+            cliente=cliente,
+        )
+    if df is None or df.empty:
+        return None, None
+    return _kpis_row(df.iloc[0].to_dict()), df.drop(columns=list(db.KPI_COLUMNS))
+
+
 def get_total_rows(
     modo,
     cod_rt,
@@ -125,6 +192,7 @@ def get_page(
     reponedor=None,
     modalidad=None,
     cliente=None,
+    after=None,
 ):
     mode = _validate_mode(modo)
     if mode == "LOCAL":
@@ -136,6 +204,7 @@ def get_page(
             foco=foco,
             search=search,
             cliente=cliente,
+            after=after,
         )
     return db.get_tabla_ux_page(
         rutero=rutero,
@@ -148,9 +217,14 @@ def get_page(
         search=search,
         modalidad=modalidad,
         cliente=cliente,
+        after=after,
     )
 
 
+def get_page_cursor(df):
+    return db.tabla_ux_cursor(df)
+
+
 def get_export_raw(
     modo,
     cod_rt,
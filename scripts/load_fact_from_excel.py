@@ -23,6 +23,8 @@ Notas:
 from __future__ import annotations
 
 import argparse
+import hashlib
+import io
 import json
 import os
 import time
@@ -31,6 +33,11 @@ from typing import Iterable
 
 import pandas as pd
 
+try:
+    import python_calamine  # type: ignore  # noqa: F401
+except ImportError:
+    python_calamine = None  # noqa
+
 
 # =========================================================
 # Normalización
@@ -40,8 +47,10 @@ def norm_col(c: str) -> str:
 
 
 def to_int_series(s: pd.Series) -> pd.Series:
-    s = s.fillna(0)
-    return pd.to_numeric(s, errors="coerce").fillna(0).round(0).astype(int)
+    # Columnas ya numéricas (lo normal al leer Excel) no pasan por to_numeric sobre object.
+    if not (pd.api.types.is_float_dtype(s) or pd.api.types.is_integer_dtype(s)):
+        s = pd.to_numeric(s, errors="coerce")
+    return s.fillna(0).round(0).astype(int)
 
 
 def to_text_series(s: pd.Series) -> pd.Series:
@@ -49,9 +58,8 @@ def to_text_series(s: pd.Series) -> pd.Series:
 
 
 def to_sku_text(s: pd.Series) -> pd.Series:
-    s = s.astype(str).str.strip()
-    s = s.str.replace(r"\.0$", "", regex=True)
-    return s
+    # SKU numérico leído como float ("123.0"): removesuffix evita el motor regex por celda.
+    return s.astype(str).str.strip().str.removesuffix(".0")
 
 
 def parse_force_dates(raw: str) -> set[date]:
@@ -94,7 +102,7 @@ def finalize_source_check(payload: dict, blockers: list[str], warnings: list[str
     return payload
 
 
-def run_source_check_fact(*, excel_path: str, sheet: str, strict: bool) -> dict:
+def run_source_check_fact(*, excel_path: str, sheet: str, strict: bool, cache_dir: str = "") -> dict:
     required = [
         "CADENA",
         "FECHA",
@@ -129,7 +137,7 @@ def run_source_check_fact(*, excel_path: str, sheet: str, strict: bool) -> dict:
         return finalize_source_check(payload, blockers, warnings, notes)
 
     try:
-        book = pd.ExcelFile(excel_file)
+        book = pd.ExcelFile(excel_file, engine=excel_engine())
     except Exception as exc:
         blockers.append(f"unreadable_workbook:{type(exc).__name__}")
         notes.append(str(exc))
@@ -141,7 +149,7 @@ def run_source_check_fact(*, excel_path: str, sheet: str, strict: bool) -> dict:
         return finalize_source_check(payload, blockers, warnings, notes)
 
     try:
-        df = pd.read_excel(excel_file, sheet_name=sheet)
+        df = read_sheet(excel_file, sheet, cache_dir=cache_dir, book=book)
     except Exception as exc:
         blockers.append(f"sheet_read_error:{sheet}:{type(exc).__name__}")
         notes.append(str(exc))
@@ -181,6 +189,60 @@ def run_source_check_fact(*, excel_path: str, sheet: str, strict: bool) -> dict:
     return finalize_source_check(payload, blockers, warnings, notes)
 
 
+# =========================================================
+# Lectura Excel
+# =========================================================
+# El source check y el payload leen la misma hoja: se parsea una vez por corrida (memo en
+# proceso) y, con --excel-cache-dir, una vez por versión del archivo (snapshot Parquet
+# keyed por ruta + mtime + tamaño + hoja).
+_SHEET_MEMO: dict[str, pd.DataFrame] = {}
+
+
+def excel_engine() -> str | None:
+    # calamine (parser en Rust) si python-calamine está instalado; si no, el default de pandas
+    # (openpyxl). FACT_LOAD_EXCEL_ENGINE fuerza un engine puntual.
+    forced = os.getenv("FACT_LOAD_EXCEL_ENGINE", "").strip()
+    if forced:
+        return forced
+    return "calamine" if python_calamine is not None else None
+
+
+def _sheet_cache_key(excel_path: str, sheet: str) -> str:
+    st = os.stat(excel_path)
+    raw = f"{os.path.abspath(excel_path)}:{st.st_mtime_ns}:{st.st_size}:{sheet}"
+    return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+
+def read_sheet(excel_path: str, sheet: str, *, cache_dir: str = "", book: pd.ExcelFile | None = None) -> pd.DataFrame:
+    key = _sheet_cache_key(excel_path, sheet)
+    df = _SHEET_MEMO.get(key)
+    cache_path = os.path.join(cache_dir, f"{key}.parquet") if cache_dir else ""
+
+    if df is None and cache_path and os.path.exists(cache_path):
+        try:
+            df = pd.read_parquet(cache_path)
+            print(f"OK: hoja {sheet} desde cache {cache_path}")
+        except Exception as exc:
+            print(f"WARN: cache Excel ilegible ({type(exc).__name__}); se vuelve a parsear.")
+
+    if df is None:
+        if book is not None:
+            df = book.parse(sheet)
+        else:
+            df = pd.read_excel(excel_path, sheet_name=sheet, engine=excel_engine())
+        if cache_path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                df.to_parquet(cache_path, index=False)
+            except Exception as exc:
+                # Columnas con tipos mezclados no van a Parquet: se sigue sin cache en disco.
+                print(f"WARN: no se pudo escribir cache Excel ({type(exc).__name__}).")
+
+    _SHEET_MEMO[key] = df
+    # Copia liviana: los consumidores renombran columnas, no tocan los datos.
+    return df.copy(deep=False)
+
+
 # =========================================================
 # DB helpers
 # =========================================================
@@ -197,6 +259,19 @@ def connect(db_url: str, connect_timeout: int):
     )
 
 
+def notify_data_version(db_url: str, connect_timeout: int) -> None:
+    # Avisa a las apps con DV_LISTEN=1 que invaliden data_version; si falla, la app cae a su TTL.
+    channel = os.getenv("DATA_VERSION_CHANNEL", "stock_zero_data_version").strip()
+    try:
+        with connect(db_url, connect_timeout) as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, %s);", (channel, datetime.now().isoformat(timespec="seconds")))
+            conn.commit()
+        print(f"OK: NOTIFY {channel}")
+    except Exception as exc:
+        print(f"WARN: NOTIFY {channel} falló ({type(exc).__name__}); la app se actualizará por TTL.")
+
+
 def fetch_db_counts(
     *,
     db_url: str,
@@ -230,13 +305,84 @@ def delete_date(
     return int(cur.rowcount or 0)
 
 
+FACT_LOAD_COLUMNS = (
+    "fecha",
+    "cadena",
+    "marca",
+    "sku",
+    "descripcion_producto",
+    "n_local",
+    "venta_u",
+    "inv_u",
+    "cod_rt",
+    "nombre_local_rr",
+    "otros",
+    "source",
+)
+STAGING_TABLE = "fact_stock_venta_stg"
+
+
+def _copy_text_value(v) -> str:
+    # Formato text de COPY: \N = NULL; "" sigue siendo string vacío (igual que execute_values).
+    if v is None or (isinstance(v, float) and v != v):
+        return r"\N"
+    return (
+        str(v)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows_batch(
+    *,
+    cur,
+    sql_insert: str,
+    rows: list[tuple],
+) -> None:
+    # COPY a staging temporal + un solo INSERT ... SELECT con el mismo ON CONFLICT de sql_insert.
+    if "VALUES %s" not in sql_insert:
+        raise ValueError("sql_insert debe contener 'VALUES %s' para el merge desde staging.")
+
+    cols = ", ".join(FACT_LOAD_COLUMNS)
+    cur.execute(
+        f"create temp table if not exists {STAGING_TABLE} on commit drop as "
+        f"select {cols} from public.fact_stock_venta with no data"
+    )
+    cur.execute(f"truncate {STAGING_TABLE}")
+
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join(_copy_text_value(v) for v in row))
+        buf.write("\n")
+    sql_copy = f"copy {STAGING_TABLE} ({cols}) from stdin"
+    if hasattr(cur, "copy_expert"):
+        # Producción: el loader conecta con psycopg2.
+        buf.seek(0)
+        cur.copy_expert(sql_copy, buf)
+    else:
+        # psycopg 3: requirements-ci.txt sólo instala psycopg 3, y el job CI_POSTGRESQL
+        # (tests/test_load_fact_copy_postgres.py) valida con él este mismo staging + merge contra
+        # un Postgres real. Mismo formato text, sólo cambia la API de COPY del driver.
+        with cur.copy(sql_copy) as copy:
+            copy.write(buf.getvalue())
+
+    cur.execute(sql_insert.replace("VALUES %s", f"SELECT {cols} FROM {STAGING_TABLE}"))
+
+
 def insert_rows_batch(
     *,
     cur,
     sql_insert: str,
     rows: list[tuple],
     page_size: int,
+    method: str = "values",
 ) -> None:
+    if method == "copy":
+        copy_rows_batch(cur=cur, sql_insert=sql_insert, rows=rows)
+        return
+
     from psycopg2.extras import execute_values
 
     execute_values(
@@ -255,8 +401,9 @@ def build_clean_payload(
     excel_path: str,
     sheet: str,
     source: str,
+    cache_dir: str = "",
 ) -> tuple[pd.DataFrame, dict[str, int]]:
-    df = pd.read_excel(excel_path, sheet_name=sheet)
+    df = read_sheet(os.path.abspath(excel_path), sheet, cache_dir=cache_dir)
     df.columns = [norm_col(c) for c in df.columns]
 
     required = [
@@ -324,24 +471,7 @@ def build_clean_payload(
 
 
 def rows_from_df(out: pd.DataFrame) -> list[tuple]:
-    return list(
-        out[
-            [
-                "fecha",
-                "cadena",
-                "marca",
-                "sku",
-                "descripcion_producto",
-                "n_local",
-                "venta_u",
-                "inv_u",
-                "cod_rt",
-                "nombre_local_rr",
-                "otros",
-                "source",
-            ]
-        ].itertuples(index=False, name=None)
-    )
+    return list(out[list(FACT_LOAD_COLUMNS)].itertuples(index=False, name=None))
 
 
 # =========================================================
@@ -396,6 +526,7 @@ def load_replace_by_date(
     batch_size: int,
     retries: int,
     connect_timeout: int,
+    insert_method: str = "values",
 ) -> dict:
     result = {
         "mode": "smart-replace-date",
@@ -427,6 +558,7 @@ def load_replace_by_date(
                                 sql_insert=sql_insert,
                                 rows=chunk,
                                 page_size=batch_size,
+                                method=insert_method,
                             )
                             loaded += len(chunk)
                             batches += 1
@@ -469,6 +601,7 @@ def load_upsert_all(
     batch_size: int,
     retries: int,
     connect_timeout: int,
+    insert_method: str = "values",
 ) -> dict:
     result = {
         "mode": "upsert-all",
@@ -486,6 +619,7 @@ def load_upsert_all(
                             sql_insert=sql_insert,
                             rows=chunk,
                             page_size=batch_size,
+                            method=insert_method,
                         )
                     conn.commit()
 
@@ -524,6 +658,11 @@ def main() -> None:
     ap.add_argument("--skip-source-check", action="store_true")
     ap.add_argument("--source-check-strict", action="store_true")
     ap.add_argument("--source-check-only", action="store_true")
+    ap.add_argument(
+        "--excel-cache-dir",
+        default=os.getenv("FACT_LOAD_EXCEL_CACHE_DIR", ""),
+        help="Carpeta para snapshot Parquet de la hoja parseada; se reusa mientras el Excel no cambie.",
+    )
 
     ap.add_argument(
         "--mode",
@@ -538,6 +677,12 @@ def main() -> None:
         help="Fechas separadas por coma para recargar sí o sí. Ej: 2026-04-28,2026-04-29",
     )
     ap.add_argument("--batch-size", type=int, default=int(os.getenv("FACT_LOAD_BATCH_SIZE", "500")))
+    ap.add_argument(
+        "--insert-method",
+        choices=["copy", "values"],
+        default=os.getenv("FACT_LOAD_INSERT_METHOD", "values"),
+        help="values usa execute_values (default); copy usa COPY a staging temporal + merge (en validación).",
+    )
     ap.add_argument("--retries", type=int, default=int(os.getenv("FACT_LOAD_RETRIES", "3")))
     ap.add_argument("--connect-timeout", type=int, default=int(os.getenv("PG_CONNECT_TIMEOUT", "20")))
 
@@ -560,6 +705,7 @@ def main() -> None:
             excel_path=args.excel,
             sheet=args.sheet,
             strict=bool(args.source_check_strict),
+            cache_dir=args.excel_cache_dir,
         )
     print_source_check(source_check)
 
@@ -579,6 +725,7 @@ def main() -> None:
         excel_path=args.excel,
         sheet=args.sheet,
         source=args.source,
+        cache_dir=args.excel_cache_dir,
     )
 
     if out.empty:
@@ -607,6 +754,7 @@ def main() -> None:
     print(f"sheet={args.sheet}")
     print(f"mode={args.mode}")
     print(f"batch_size={args.batch_size}")
+    print(f"insert_method={args.insert_method}")
     print(f"retries={args.retries}")
     print(f"stats={stats}")
     print(plan.to_string(index=False))
@@ -661,6 +809,7 @@ def main() -> None:
             batch_size=args.batch_size,
             retries=args.retries,
             connect_timeout=args.connect_timeout,
+            insert_method=args.insert_method,
         )
     else:
         rows = rows_from_df(out)
@@ -671,12 +820,14 @@ def main() -> None:
             batch_size=args.batch_size,
             retries=args.retries,
             connect_timeout=args.connect_timeout,
+            insert_method=args.insert_method,
         )
 
     print(f"LOAD_RESULT: {load_result}")
 
     if args.no_refresh_cliente_mvs:
         print("SKIP: refresh post-carga de MVs CLIENTE omitido por --no-refresh-cliente-mvs")
+        notify_data_version(args.db_url, args.connect_timeout)
         print(f"elapsed_ms={round((time.perf_counter() - t0) * 1000)}")
         return
 
@@ -688,6 +839,7 @@ def main() -> None:
         run_smoke=True,
     )
     print(refresh_result)
+    notify_data_version(args.db_url, args.connect_timeout)
 
     print(
         "OK: carga finalizada | "
@@ -18,25 +18,36 @@ Uso:
 Nota:
     No se genera TXT por defecto. El dump TXT requiere --out explicito.
     codigo_app_stockzero.txt queda deprecado como salida por defecto.
+    Cache de parseo opcional: --parse-cache <archivo.sqlite> (nunca en un temp compartido).
 """
 
 from __future__ import annotations
 
 import argparse
 import ast
+import faulthandler
 import hashlib
 import importlib.util
 import json
 import os
+import sqlite3
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator, NamedTuple
+
+
+def available_cpus() -> int:
+    # CPUs que el proceso puede usar de verdad (afinidad/cgroups en Linux CI); cpu_count() si no hay API.
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
 
 
 SCANNER_VERSION = "9B14_5_P1B"
-IGNORE_DIRS = {
+IGNORE_DIRS = frozenset({
     ".git",
     ".svn",
     ".hg",
@@ -48,17 +59,43 @@ IGNORE_DIRS = {
     "env",
     ".streamlit",
     "node_modules",
-}
+})
 TARGET_PKGS = ["streamlit", "pandas", "openpyxl"]
 ARCHIVE_PREFIXES = ("app/v_i/",)
 UTF8_BOM = b"\xef\xbb\xbf"
+# Bajo este numero de archivos el costo de levantar procesos supera al parseo serial.
+PARALLEL_MIN_FILES = 8
+PARALLEL_CHUNKSIZE = 16
+# Lectura+sha256 en hilos cuando se parsea en un solo proceso (hashlib y la I/O sueltan el GIL).
+HASH_THREADS = min(8, available_cpus())
+# Imports y defs/classes solo viven en sentencias: el recorrido no baja a expresiones.
+AST_STATEMENT_NODES = (ast.stmt, ast.excepthandler, ast.match_case)
+SYMBOL_KINDS = {ast.FunctionDef: "def", ast.AsyncFunctionDef: "async def", ast.ClassDef: "class"}
+# Cache de parseo (opt-in); se invalida con otra version del scanner, de Python o del formato.
+PARSE_CACHE_TAG = f"{SCANNER_VERSION}|py{sys.version_info[0]}.{sys.version_info[1]}|json"
+
+
+class PyFilePre(NamedTuple):
+    # Lo que el walker ya sabe de cada archivo: el stat sale del DirEntry (gratis en Windows).
+    path: Path
+    size: int
+    mtime: float | None
+    mtime_ns: int | None = None
 
 
-@dataclass
+class ParseCacheEntry(NamedTuple):
+    sha256_bytes: str
+    parse_ok: bool
+    syntax_error: str | None
+    imports: list[str]
+    symbols: list[tuple[int, str, str]]
+
+
+@dataclass(slots=True)
 class PyFileInfo:
     rel: str
     abs_path: Path
-    src: str
+    src: bytes
     size: int
     mtime: str
     encoding_used: str
@@ -73,6 +110,14 @@ class PyFileInfo:
     symbols: list[tuple[int, str, str]] = field(default_factory=list)
     warnings: list[str] = field(default_factory=list)
 
+    def source_text(self) -> str:
+        # src guarda los bytes crudos; el texto se decodifica recien al volcar, con el mismo
+        # encoding detectado al leer (no queda un str por archivo vivo durante todo el scan).
+        if not self.src or self.read_error:
+            return ""
+        errors = "replace" if self.encoding_used == "cp1252" else "strict"
+        return self.src.decode(self.encoding_used, errors=errors)
+
     def to_json(self) -> dict[str, Any]:
         return {
             "path": self.rel,
@@ -115,27 +160,64 @@ def sha256_text(text: str) -> str:
     return h.hexdigest()
 
 
+def read_bytes_and_hash(path: Path) -> tuple[bytes, str]:
+    raw = path.read_bytes()
+    return raw, hashlib.sha256(raw).hexdigest()
+
+
+def text_hash_from_bytes(raw: bytes, src: str, encoding_used: str, sha_bytes: str) -> str:
+    # Si el archivo decodifico como UTF-8 estricto, normalizar CR/LF sobre los bytes da lo mismo
+    # que normalizar el str y re-codificarlo (CR y LF son ASCII), sin materializar otra copia str.
+    # Sin BOM ni CR el texto normalizado son los mismos bytes y se reutiliza el hash ya calculado.
+    if encoding_used == "utf-8" and b"\r" not in raw:
+        return sha_bytes
+    if encoding_used in {"utf-8", "utf-8-sig"}:
+        body = raw[len(UTF8_BOM):] if encoding_used == "utf-8-sig" and raw.startswith(UTF8_BOM) else raw
+        if b"\r" in body:
+            body = body.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        return hashlib.sha256(body).hexdigest()
+    return sha256_text(src)
+
+
 def is_archive_file(rel_path: str) -> bool:
     rel_posix = rel_path.replace("\\", "/")
     return any(rel_posix.startswith(prefix) for prefix in ARCHIVE_PREFIXES)
 
 
-def collect_py_files(root: Path, scope: str) -> list[Path]:
-    files: list[Path] = []
-    for dirpath, dirnames, filenames in os.walk(root):
-        dirnames[:] = [d for d in dirnames if d not in IGNORE_DIRS]
-        for fn in filenames:
-            if not fn.lower().endswith(".py"):
-                continue
-            abs_path = Path(dirpath) / fn
-            rel = str(abs_path.relative_to(root)).replace("\\", "/")
-            if scope == "active" and is_archive_file(rel):
-                continue
-            files.append(abs_path)
-    return sorted(files, key=lambda path: str(path).lower())
-
-
-def collect_all_py_files(root: Path) -> list[Path]:
+def collect_py_files(root: Path, scope: str) -> list[PyFilePre]:
+    # scandir directo: el tipo de cada entrada viene del dirent y no hay listas intermedias
+    # de os.walk. Igual que os.walk(followlinks=False): no baja por symlinks a directorios.
+    files: list[PyFilePre] = []
+    stack = [str(root)]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if entry.name not in IGNORE_DIRS and not entry.is_symlink():
+                        stack.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(".py"):
+                    continue
+                abs_path = Path(entry.path)
+                if scope == "active" and is_archive_file(str(abs_path.relative_to(root)).replace("\\", "/")):
+                    continue
+                try:
+                    st = entry.stat()
+                    files.append(PyFilePre(abs_path, st.st_size, st.st_mtime, st.st_mtime_ns))
+                except OSError:
+                    files.append(PyFilePre(abs_path, -1, None))
+    return sorted(files, key=lambda pre: str(pre.path).lower())
+
+
+def collect_all_py_files(root: Path) -> list[PyFilePre]:
     return collect_py_files(root, scope="all")
 
 
@@ -152,55 +234,83 @@ def safe_decode_bytes(data: bytes) -> tuple[str, str, str | None]:
     for encoding, errors in candidates:
         try:
             return data.decode(encoding, errors=errors), encoding, None
-        except Exception as exc:  # pragma: no cover - defensive
+        except UnicodeDecodeError as exc:
             last_error = f"{type(exc).__name__}: {exc}"
     return "", "binary", last_error or "UNKNOWN_READ_ERROR"
 
 
-def parse_imports(tree: ast.AST) -> list[str]:
+def parse_ast(tree: ast.AST) -> tuple[list[str], list[tuple[int, str, str]]]:
+    # Mismo orden que ast.walk (BFS), pero solo encolando sentencias: las expresiones son la
+    # gran mayoria de nodos y nunca contienen imports ni defs. Los defs anidados se siguen
+    # recorriendo porque el propio def queda en la cola.
+    # Las sentencias solo viven en campos lista homogeneos (body, orelse, handlers, cases...),
+    # asi que basta mirar _fields y el primer elemento; la lista crece mientras se recorre.
     imports: list[str] = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Import):
-            for name in node.names:
-                imports.append(name.name)
-        elif isinstance(node, ast.ImportFrom):
-            imports.append(node.module or "")
-    seen: set[str] = set()
-    ordered: list[str] = []
-    for item in imports:
-        if item and item not in seen:
-            seen.add(item)
-            ordered.append(item)
-    return ordered
-
-
-def parse_symbols(tree: ast.AST) -> list[tuple[int, str, str]]:
     symbols: list[tuple[int, str, str]] = []
-    for node in ast.walk(tree):
-        if isinstance(node, ast.FunctionDef):
-            symbols.append((getattr(node, "lineno", -1), "def", node.name))
-        elif isinstance(node, ast.AsyncFunctionDef):
-            symbols.append((getattr(node, "lineno", -1), "async def", node.name))
-        elif isinstance(node, ast.ClassDef):
-            symbols.append((getattr(node, "lineno", -1), "class", node.name))
+    todo: list[ast.AST] = [tree]
+    for parent in todo:
+        for field_name in parent._fields:
+            value = getattr(parent, field_name, None)
+            if type(value) is not list or not value or not isinstance(value[0], AST_STATEMENT_NODES):
+                continue
+            todo.extend(value)
+            for node in value:
+                t = type(node)
+                if t is ast.Import:
+                    for name in node.names:
+                        imports.append(name.name)
+                elif t is ast.ImportFrom:
+                    imports.append(node.module or "")
+                elif t in SYMBOL_KINDS:
+                    symbols.append((getattr(node, "lineno", -1), SYMBOL_KINDS[t], node.name))
+
+    # dict.fromkeys deduplica en C conservando el orden de aparicion; "" (from . import x) no cuenta.
+    unique = dict.fromkeys(imports)
+    unique.pop("", None)
     symbols = [item for item in symbols if item[0] and item[0] > 0]
     symbols.sort(key=lambda item: item[0])
-    return symbols
+    return list(unique), symbols
+
+
+_LINE_PREFIXES: dict[int, list[str]] = {}
+
+
+def line_prefixes(count: int, width: int) -> list[str]:
+    # Prefijos "00001 | " ya armados y compartidos entre archivos; crece al doble si falta.
+    prefixes = _LINE_PREFIXES.get(width)
+    if prefixes is None or len(prefixes) < count:
+        size = max(count, 2 * len(prefixes or ()), 4096)
+        prefixes = [str(i).zfill(width) + " | " for i in range(1, size + 1)]
+        _LINE_PREFIXES[width] = prefixes
+    return prefixes
+
+
+def numbered_code_lines(src: str, width: int = 5) -> list[str]:
+    # Una concatenacion por linea contra prefijos precalculados (map se corta en la mas corta).
+    lines = src.splitlines()
+    return list(map(str.__add__, line_prefixes(len(lines), width), lines))
 
 
 def format_code_with_lineno(src: str, width: int = 5) -> str:
-    return "\n".join(f"{i:0{width}d} | {line}" for i, line in enumerate(src.splitlines(), start=1))
+    return "\n".join(numbered_code_lines(src, width=width))
 
 
 def format_syntax_error(exc: SyntaxError) -> str:
     return f"{exc.msg} (line {exc.lineno}:{exc.offset})"
 
 
-def load_file_info(root: Path, path: Path) -> PyFileInfo:
+def load_file_info(
+    root: Path,
+    pre: PyFilePre,
+    cached: ParseCacheEntry | None = None,
+    loaded: tuple[bytes, str] | OSError | None = None,
+) -> PyFileInfo:
+    path = pre.path
     rel = str(path.relative_to(root))
     warnings: list[str] = []
+    raw = b""
     src = ""
-    size = -1
+    size = pre.size
     mtime = "N/A"
     encoding_used = ""
     has_utf8_bom = False
@@ -213,45 +323,54 @@ def load_file_info(root: Path, path: Path) -> PyFileInfo:
     symbols: list[tuple[int, str, str]] = []
     has_streamlit = False
 
-    try:
-        stat = path.stat()
-        size = stat.st_size
-        mtime = datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds")
-    except Exception:
-        pass
+    if pre.mtime is not None:
+        try:
+            mtime = datetime.fromtimestamp(pre.mtime).isoformat(timespec="seconds")
+        except (OverflowError, OSError, ValueError):
+            pass
 
     try:
-        raw = path.read_bytes()
+        if isinstance(loaded, OSError):
+            raise loaded
+        raw, sha_bytes = loaded if loaded is not None else read_bytes_and_hash(path)
         has_utf8_bom = raw.startswith(UTF8_BOM)
         if has_utf8_bom:
             warnings.append("bom_warning")
-        sha_bytes = sha256_bytes(raw)
         src, encoding_used, decode_error = safe_decode_bytes(raw)
         if decode_error:
             read_error = decode_error
-        sha_text = sha256_text(src)
-    except Exception as exc:
+        sha_text = text_hash_from_bytes(raw, src, encoding_used, sha_bytes)
+    except OSError as exc:
         read_error = f"{type(exc).__name__}: {exc}"
         warnings.append("read_error")
 
-    if read_error is None:
+    if read_error is None and cached is not None and cached.sha256_bytes == sha_bytes:
+        # Mismo contenido que en la corrida anterior: se reutiliza el parseo sin ast.parse.
+        parse_ok = cached.parse_ok
+        syntax_error = cached.syntax_error
+        imports = list(cached.imports)
+        symbols = list(cached.symbols)
+        has_streamlit = any(item == "streamlit" or item.startswith("streamlit.") for item in imports)
+        if syntax_error:
+            warnings.append("syntax_error")
+    elif read_error is None:
         try:
-            tree = ast.parse(src, filename=str(path))
+            # compile directo (lo mismo que hace ast.parse por dentro, sin su capa Python).
+            tree = compile(src, str(path), "exec", ast.PyCF_ONLY_AST)
             parse_ok = True
-            imports = parse_imports(tree)
-            symbols = parse_symbols(tree)
+            imports, symbols = parse_ast(tree)
             has_streamlit = any(item == "streamlit" or item.startswith("streamlit.") for item in imports)
         except SyntaxError as exc:
             syntax_error = format_syntax_error(exc)
             warnings.append("syntax_error")
-        except Exception as exc:  # pragma: no cover - defensive
+        except (ValueError, RecursionError) as exc:  # pragma: no cover - bytes nulos / anidamiento extremo
             syntax_error = f"{type(exc).__name__}: {exc}"
             warnings.append("syntax_error")
 
     return PyFileInfo(
         rel=rel,
         abs_path=path,
-        src=src,
+        src=raw,
         size=size,
         mtime=mtime,
         encoding_used=encoding_used or "unknown",
@@ -268,6 +387,182 @@ def load_file_info(root: Path, path: Path) -> PyFileInfo:
     )
 
 
+def load_file_info_mp(task: tuple[str, PyFilePre, ParseCacheEntry | None]) -> tuple[str, Any]:
+    # Worker del pool: nunca propaga excepciones entre procesos.
+    root_str, pre, cached = task
+    try:
+        return "ok", load_file_info(Path(root_str), pre, cached)
+    except Exception as exc:  # pragma: no cover - defensive
+        return "error", f"{type(exc).__name__}: {exc}"
+
+
+def failed_file_info(root: Path, path: Path, error: str) -> PyFileInfo:
+    return PyFileInfo(
+        rel=str(path.relative_to(root)),
+        abs_path=path,
+        src=b"",
+        size=-1,
+        mtime="N/A",
+        encoding_used="unknown",
+        has_utf8_bom=False,
+        sha256_bytes="",
+        sha256_text="",
+        read_error=error,
+        syntax_error=None,
+        parse_ok=False,
+        warnings=["read_error"],
+    )
+
+
+def read_bytes_and_hash_safe(path: Path) -> tuple[bytes, str] | OSError:
+    try:
+        return read_bytes_and_hash(path)
+    except OSError as exc:
+        return exc
+
+
+def load_file_infos_serial(
+    root: Path,
+    files: list[PyFilePre],
+    cache: dict[str, ParseCacheEntry],
+) -> list[PyFileInfo]:
+    if len(files) < PARALLEL_MIN_FILES or HASH_THREADS < 2:
+        return [load_file_info(root, pre, cache.get(str(pre.path))) for pre in files]
+    # El parseo queda en este proceso; la lectura y el hash de los siguientes archivos avanzan
+    # en hilos mientras tanto (map entrega en orden y a medida que terminan).
+    with ThreadPoolExecutor(max_workers=HASH_THREADS) as tp:
+        loaded = tp.map(read_bytes_and_hash_safe, [pre.path for pre in files])
+        return [load_file_info(root, pre, cache.get(str(pre.path)), item) for pre, item in zip(files, loaded)]
+
+
+def load_file_infos(
+    root: Path,
+    files: list[PyFilePre],
+    workers: int = 0,
+    cache: dict[str, ParseCacheEntry] | None = None,
+) -> list[PyFileInfo]:
+    cache = cache or {}
+    if workers == 1 or len(files) < PARALLEL_MIN_FILES:
+        return load_file_infos_serial(root, files, cache)
+
+    tasks = [(str(root), pre, cache.get(str(pre.path))) for pre in files]
+    try:
+        with ProcessPoolExecutor(max_workers=workers or available_cpus()) as ex:
+            results = list(ex.map(load_file_info_mp, tasks, chunksize=PARALLEL_CHUNKSIZE))
+    except (OSError, NotImplementedError):
+        # Entornos sin soporte de multiprocessing: mismo resultado en un solo proceso.
+        return load_file_infos_serial(root, files, cache)
+
+    file_infos: list[PyFileInfo] = []
+    for pre, (status, value) in zip(files, results):
+        file_infos.append(value if status == "ok" else failed_file_info(root, pre.path, value))
+    return file_infos
+
+
+def is_cache_row_fresh(pre: PyFilePre | None, mtime_ns: Any, size: Any) -> bool:
+    return pre is not None and pre.mtime_ns is not None and pre.mtime_ns == mtime_ns and pre.size == size
+
+
+def parse_cache_misses(
+    files: list[PyFilePre],
+    file_infos: list[PyFileInfo],
+    cache: dict[str, ParseCacheEntry],
+) -> list[tuple[PyFilePre, PyFileInfo]]:
+    misses: list[tuple[PyFilePre, PyFileInfo]] = []
+    for pre, fi in zip(files, file_infos):
+        if fi.read_error or pre.mtime_ns is None:
+            continue
+        hit = cache.get(str(pre.path))
+        if hit is not None and hit.sha256_bytes == fi.sha256_bytes:
+            continue
+        misses.append((pre, fi))
+    return misses
+
+
+def open_parse_cache(path: Path) -> sqlite3.Connection | None:
+    try:
+        conn = sqlite3.connect(str(path))
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, tag TEXT, sha TEXT, "
+            "parse_ok INTEGER, syntax_error TEXT, imports TEXT, symbols TEXT)"
+        )
+        return conn
+    except sqlite3.Error:
+        return None
+
+
+def decode_parse_payload(imports_json: Any, symbols_json: Any) -> tuple[list[str], list[tuple[int, str, str]]]:
+    # El cache guarda JSON de tipos basicos (nunca pickle): una fila plantada solo puede fallar
+    # la validacion, no ejecutar codigo.
+    imports = json.loads(imports_json)
+    symbols = json.loads(symbols_json)
+    if not isinstance(imports, list) or not all(isinstance(item, str) for item in imports):
+        raise ValueError("imports invalidos")
+    if not isinstance(symbols, list):
+        raise ValueError("symbols invalidos")
+    out: list[tuple[int, str, str]] = []
+    for item in symbols:
+        lineno, kind, name = item
+        if type(lineno) is not int or not isinstance(kind, str) or not isinstance(name, str):
+            raise ValueError("symbol invalido")
+        out.append((lineno, kind, name))
+    return imports, out
+
+
+def read_parse_cache(conn: sqlite3.Connection, files: list[PyFilePre]) -> dict[str, ParseCacheEntry]:
+    # Una sola lectura de la tabla; solo valen filas con mismo (mtime_ns, size) y mismo tag.
+    wanted = {str(pre.path): pre for pre in files}
+    entries: dict[str, ParseCacheEntry] = {}
+    try:
+        rows = conn.execute(
+            "SELECT path, mtime_ns, size, sha, parse_ok, syntax_error, imports, symbols FROM files WHERE tag = ?",
+            (PARSE_CACHE_TAG,),
+        ).fetchall()
+    except sqlite3.Error:
+        return {}
+    for path, mtime_ns, size, sha, parse_ok, syntax_error, imports, symbols in rows:
+        if not is_cache_row_fresh(wanted.get(path), mtime_ns, size):
+            continue
+        if not isinstance(sha, str) or not (syntax_error is None or isinstance(syntax_error, str)):
+            continue
+        try:
+            imports_list, symbols_list = decode_parse_payload(imports, symbols)
+        except (TypeError, ValueError):
+            continue
+        entries[path] = ParseCacheEntry(sha, bool(parse_ok), syntax_error, imports_list, symbols_list)
+    return entries
+
+
+def write_parse_cache(
+    conn: sqlite3.Connection,
+    files: list[PyFilePre],
+    file_infos: list[PyFileInfo],
+    cache: dict[str, ParseCacheEntry],
+) -> None:
+    rows = [
+        (
+            str(pre.path),
+            pre.mtime_ns,
+            pre.size,
+            PARSE_CACHE_TAG,
+            fi.sha256_bytes,
+            int(fi.parse_ok),
+            fi.syntax_error,
+            json.dumps(fi.imports, ensure_ascii=False),
+            json.dumps(fi.symbols, ensure_ascii=False),
+        )
+        for pre, fi in parse_cache_misses(files, file_infos, cache)
+    ]
+    if not rows:
+        return
+    try:
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    except sqlite3.Error:
+        pass
+
+
 def build_summary(
     file_infos: list[PyFileInfo],
     *,
@@ -305,95 +600,95 @@ def build_summary(
     }
 
 
-def build_txt_report(
+def iter_txt_report(
     *,
     root: Path,
     args: argparse.Namespace,
     file_infos: list[PyFileInfo],
     summary: dict[str, Any],
-) -> list[str]:
+) -> Iterator[str]:
+    # file_infos llega ordenado por rel.lower() desde main().
     syntax_entries = [(fi.rel, fi.syntax_error) for fi in file_infos if fi.syntax_error]
     read_entries = [(fi.rel, fi.read_error) for fi in file_infos if fi.read_error]
     bom_entries = [fi.rel for fi in file_infos if fi.has_utf8_bom]
     st_files = [fi.rel for fi in file_infos if fi.has_streamlit]
 
-    lines: list[str] = []
-    lines.append("=" * 96)
-    lines.append("SCANNER AUDIT REPORT (FULL DUMP)")
-    lines.append(f"Scanner version: {SCANNER_VERSION}")
-    lines.append(f"Fecha         : {datetime.now().isoformat(timespec='seconds')}")
-    lines.append(f"Root          : {root}")
-    lines.append("=" * 96)
-    lines.append("")
-
-    lines.append("[SUMMARY]")
-    lines.append(f"- scope                   : {args.scope}")
-    lines.append(f"- total_py_files          : {summary['total_py_files']}")
-    lines.append(f"- parse_ok                : {summary['parse_ok']}")
-    lines.append(f"- syntax_errors           : {summary['syntax_errors']}")
-    lines.append(f"- read_errors             : {summary['read_errors']}")
-    lines.append(f"- bom_warnings            : {summary['bom_warnings']}")
-    lines.append(f"- streamlit_importers     : {summary['streamlit_importers']}")
-    lines.append(f"- active_files_count      : {summary['active_files_count']}")
-    lines.append(f"- archive_v_i_files_count : {summary['archive_v_i_files_count']}")
-    lines.append("- blockers                :")
+    yield "=" * 96
+    yield "SCANNER AUDIT REPORT (FULL DUMP)"
+    yield f"Scanner version: {SCANNER_VERSION}"
+    yield f"Fecha         : {datetime.now().isoformat(timespec='seconds')}"
+    yield f"Root          : {root}"
+    yield "=" * 96
+    yield ""
+
+    yield "[SUMMARY]"
+    yield f"- scope                   : {args.scope}"
+    yield f"- total_py_files          : {summary['total_py_files']}"
+    yield f"- parse_ok                : {summary['parse_ok']}"
+    yield f"- syntax_errors           : {summary['syntax_errors']}"
+    yield f"- read_errors             : {summary['read_errors']}"
+    yield f"- bom_warnings            : {summary['bom_warnings']}"
+    yield f"- streamlit_importers     : {summary['streamlit_importers']}"
+    yield f"- active_files_count      : {summary['active_files_count']}"
+    yield f"- archive_v_i_files_count : {summary['archive_v_i_files_count']}"
+    yield "- blockers                :"
     if summary["blockers"]:
         for blocker in summary["blockers"]:
-            lines.append(f"  - {blocker}")
+            yield f"  - {blocker}"
     else:
-        lines.append("  - (none)")
-    lines.append("- next_actions            :")
+        yield "  - (none)"
+    yield "- next_actions            :"
     for action in summary["next_actions"]:
-        lines.append(f"  - {action}")
-    lines.append("")
+        yield f"  - {action}"
+    yield ""
 
-    lines.append("[PYTHON]")
-    lines.append(f"sys.executable: {sys.executable}")
-    lines.append(f"sys.version   : {sys.version.replace(os.linesep, ' ')}")
-    lines.append("")
+    yield "[PYTHON]"
+    yield f"sys.executable: {sys.executable}"
+    yield f"sys.version   : {sys.version.replace(os.linesep, ' ')}"
+    yield ""
 
-    lines.append("[PACKAGES CHECK]")
+    yield "[PACKAGES CHECK]"
     for pkg in TARGET_PKGS:
-        lines.append(f"{pkg:10s}: {pkg_status(pkg)}")
-    lines.append("")
+        yield f"{pkg:10s}: {pkg_status(pkg)}"
+    yield ""
 
-    lines.append("[SYNTAX]")
+    yield "[SYNTAX]"
     if not syntax_entries and not read_entries:
-        lines.append("OK: Sin errores de sintaxis ni de lectura.")
+        yield "OK: Sin errores de sintaxis ni de lectura."
     else:
-        lines.append(f"syntax_errors: {len(syntax_entries)}")
-        lines.append(f"read_errors  : {len(read_entries)}")
+        yield f"syntax_errors: {len(syntax_entries)}"
+        yield f"read_errors  : {len(read_entries)}"
         for rel, err in syntax_entries:
-            lines.append(f"- {rel}: {err}")
+            yield f"- {rel}: {err}"
         for rel, err in read_entries:
-            lines.append(f"- {rel}: {err}")
-    lines.append("")
+            yield f"- {rel}: {err}"
+    yield ""
 
-    lines.append("[WARNINGS]")
+    yield "[WARNINGS]"
     if bom_entries:
         for rel in bom_entries:
-            lines.append(f"- {rel}: bom_warning")
+            yield f"- {rel}: bom_warning"
     else:
-        lines.append("OK: Sin warnings.")
-    lines.append("")
+        yield "OK: Sin warnings."
+    yield ""
 
-    lines.append("[IMPORTS BY FILE] (resumen)")
-    for fi in sorted(file_infos, key=lambda item: item.rel.lower()):
+    yield "[IMPORTS BY FILE] (resumen)"
+    for fi in file_infos:
         imports = ", ".join(fi.imports) if fi.imports else "(sin imports)"
-        lines.append(f"- {fi.rel}: {imports}")
-    lines.append("")
+        yield f"- {fi.rel}: {imports}"
+    yield ""
 
-    lines.append("[STREAMLIT IMPORTERS]")
-    lines.append(f"Archivos que importan streamlit: {len(st_files)}")
+    yield "[STREAMLIT IMPORTERS]"
+    yield f"Archivos que importan streamlit: {len(st_files)}"
     for rel in st_files:
-        lines.append(f"- {rel}")
-    lines.append("")
-
-    lines.append("=" * 96)
-    lines.append("[INDEX / TOC]")
-    lines.append("Tip: usa Ctrl+F por el marcador exacto:  <<<BEGIN FILE: <ruta>>>")
-    lines.append("=" * 96)
-    for idx, fi in enumerate(sorted(file_infos, key=lambda item: item.rel.lower()), start=1):
+        yield f"- {rel}"
+    yield ""
+
+    yield "=" * 96
+    yield "[INDEX / TOC]"
+    yield "Tip: usa Ctrl+F por el marcador exacto:  <<<BEGIN FILE: <ruta>>>"
+    yield "=" * 96
+    for idx, fi in enumerate(file_infos, start=1):
         tag = "STREAMLIT" if fi.has_streamlit else "PY"
         flag_parts: list[str] = []
         if fi.has_utf8_bom:
@@ -405,59 +700,68 @@ def build_txt_report(
         elif fi.parse_ok:
             flag_parts.append("PARSE_OK")
         flags = ",".join(flag_parts) if flag_parts else "NONE"
-        lines.append(
+        yield (
             f"{idx:02d}) [{tag}] {fi.rel}  | size={fi.size} | mtime={fi.mtime} | "
             f"encoding={fi.encoding_used} | sha256_bytes={fi.sha256_bytes[:12]}... | flags={flags}"
         )
         if fi.symbols:
             for lineno, kind, name in fi.symbols:
-                lines.append(f"    - L{lineno:04d}  {kind}  {name}")
+                yield f"    - L{lineno:04d}  {kind}  {name}"
         elif fi.read_error:
-            lines.append(f"    - read_error  {fi.read_error}")
+            yield f"    - read_error  {fi.read_error}"
         elif fi.syntax_error:
-            lines.append(f"    - syntax_error  {fi.syntax_error}")
+            yield f"    - syntax_error  {fi.syntax_error}"
         else:
-            lines.append("    - (sin defs/classes detectables)")
-    lines.append("")
+            yield "    - (sin defs/classes detectables)"
+    yield ""
 
-    lines.append("=" * 96)
-    lines.append("[FULL CODE DUMP]")
-    lines.append("Formato: '00001 | <linea>'")
+    yield "=" * 96
+    yield "[FULL CODE DUMP]"
+    yield "Formato: '00001 | <linea>'"
     if args.max_dump_lines and args.max_dump_lines > 0:
-        lines.append(f"Max lineas por archivo: {args.max_dump_lines}")
-    lines.append("=" * 96)
-    lines.append("")
-
-    for fi in sorted(file_infos, key=lambda item: item.rel.lower()):
-        lines.extend(
-            [
-                "-" * 96,
-                f"<<<BEGIN FILE: {fi.rel}>>>",
-                f"SIZE           : {fi.size} bytes",
-                f"MTIME          : {fi.mtime}",
-                f"ENCODING       : {fi.encoding_used}",
-                f"HAS_UTF8_BOM   : {fi.has_utf8_bom}",
-                f"SHA256(bytes)  : {fi.sha256_bytes}",
-                f"SHA256(text)   : {fi.sha256_text}",
-                f"READ_ERROR     : {fi.read_error or 'None'}",
-                f"SYNTAX_ERROR   : {fi.syntax_error or 'None'}",
-                f"PARSE_OK       : {fi.parse_ok}",
-                f"WARNINGS       : {', '.join(fi.warnings) if fi.warnings else '(none)'}",
-                "-" * 96,
-            ]
+        yield f"Max lineas por archivo: {args.max_dump_lines}"
+    yield "=" * 96
+    yield ""
+
+    for fi in file_infos:
+        yield from (
+            "-" * 96,
+            f"<<<BEGIN FILE: {fi.rel}>>>",
+            f"SIZE           : {fi.size} bytes",
+            f"MTIME          : {fi.mtime}",
+            f"ENCODING       : {fi.encoding_used}",
+            f"HAS_UTF8_BOM   : {fi.has_utf8_bom}",
+            f"SHA256(bytes)  : {fi.sha256_bytes}",
+            f"SHA256(text)   : {fi.sha256_text}",
+            f"READ_ERROR     : {fi.read_error or 'None'}",
+            f"SYNTAX_ERROR   : {fi.syntax_error or 'None'}",
+            f"PARSE_OK       : {fi.parse_ok}",
+            f"WARNINGS       : {', '.join(fi.warnings) if fi.warnings else '(none)'}",
+            "-" * 96,
         )
-        if fi.src:
-            dump = format_code_with_lineno(fi.src, width=5)
-            if args.max_dump_lines and args.max_dump_lines > 0:
-                dump_lines = dump.splitlines()
-                if len(dump_lines) > args.max_dump_lines:
-                    dump = "\n".join(dump_lines[: args.max_dump_lines]) + "\n... (TRUNCADO) ..."
-            lines.append(dump)
+        src = fi.source_text()
+        if src:
+            dump_lines = numbered_code_lines(src, width=5)
+            if args.max_dump_lines and args.max_dump_lines > 0 and len(dump_lines) > args.max_dump_lines:
+                yield from dump_lines[: args.max_dump_lines]
+                yield "... (TRUNCADO) ..."
+            else:
+                yield from dump_lines
         else:
-            lines.append("(sin dump por read_error)")
-        lines.append(f"\n<<<END FILE: {fi.rel}>>>")
-        lines.append("")
-    return lines
+            yield "(sin dump por read_error)"
+        yield f"\n<<<END FILE: {fi.rel}>>>"
+        yield ""
+
+
+def write_txt_report(out_path: Path, lines: Iterable[str]) -> None:
+    # Escritura incremental con buffer grande: el reporte nunca se arma completo en memoria.
+    # Mismo contenido que "\n".join(lines): separador antes de cada linea salvo la primera.
+    it = iter(lines)
+    with out_path.open("w", encoding="utf-8", buffering=1 << 20) as out:
+        out.write(next(it, ""))
+        for line in it:
+            out.write("\n")
+            out.write(line)
 
 
 def build_json_payload(
@@ -493,18 +797,45 @@ def main() -> int:
     parser.add_argument("--scope", choices=["all", "active"], default="all")
     parser.add_argument("--json-out", default="", help="Archivo JSON de salida opcional")
     parser.add_argument("--fail-on-syntax", action="store_true")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Procesos para parsear archivos (0 = CPUs disponibles para el proceso, 1 = serial).",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default="",
+        help="Archivo SQLite opcional para cachear el parseo entre corridas (no usar un temp compartido).",
+    )
     args = parser.parse_args()
+    # Sin except genericos en el loop: si algo revienta en C (o en un worker) queda el traceback.
+    faulthandler.enable()
 
     root = Path(args.root).resolve()
     out_path = Path(args.out).resolve() if args.out else None
     json_out_path = Path(args.json_out).resolve() if args.json_out else None
 
+    # Un solo recorrido (ya ordenado); el scope active se filtra sobre esa misma lista.
     all_py_files = collect_all_py_files(root)
-    selected_py_files = collect_py_files(root, scope=args.scope)
-    active_files_count = sum(1 for path in all_py_files if not is_archive_file(str(path.relative_to(root)).replace("\\", "/")))
+    active_py_files = [
+        pre for pre in all_py_files if not is_archive_file(str(pre.path.relative_to(root)).replace("\\", "/"))
+    ]
+    selected_py_files = active_py_files if args.scope == "active" else all_py_files
+    active_files_count = len(active_py_files)
     archive_v_i_files_count = len(all_py_files) - active_files_count
 
-    file_infos = [load_file_info(root, path) for path in selected_py_files]
+    # Cache solo si se pide explicitamente: por defecto los reportes van a %TEMP%/tmp compartidos
+    # (sz_preflight) y un cache ahi seria escribible por otros usuarios.
+    cache_path = Path(args.parse_cache).resolve() if args.parse_cache else None
+    cache_conn = open_parse_cache(cache_path) if cache_path is not None else None
+    parse_cache = read_parse_cache(cache_conn, selected_py_files) if cache_conn is not None else {}
+    file_infos = load_file_infos(root, selected_py_files, workers=args.workers, cache=parse_cache)
+    if cache_conn is not None:
+        write_parse_cache(cache_conn, selected_py_files, file_infos, parse_cache)
+        cache_conn.close()
+    # Orden del reporte, una sola vez; iter_txt_report lo asume.
+    file_infos.sort(key=lambda item: item.rel.lower())
     summary = build_summary(
         file_infos,
         scope=args.scope,
@@ -513,8 +844,7 @@ def main() -> int:
     )
 
     if out_path is not None:
-        txt_lines = build_txt_report(root=root, args=args, file_infos=file_infos, summary=summary)
-        out_path.write_text("\n".join(txt_lines), encoding="utf-8")
+        write_txt_report(out_path, iter_txt_report(root=root, args=args, file_infos=file_infos, summary=summary))
 
     if json_out_path is not None:
         payload = build_json_payload(root=root, scope=args.scope, summary=summary, file_infos=file_infos)
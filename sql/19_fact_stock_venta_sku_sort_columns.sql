@@ -0,0 +1,29 @@
+-- NO APPLY
+-- REVIEW DDL ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Reposicion sort contract: MARCA -> SKU numerico -> SKU texto -> descripcion.
+-- Precomputa la clasificacion numerica del SKU una sola vez por fila en lugar
+-- de evaluar regex + cast en cada ORDER BY de tabla/export.
+
+begin;
+
+-- Limite 18 digitos: un generated column que falla rompe el INSERT del loader.
+alter table public.fact_stock_venta
+    add column if not exists sku_is_num boolean
+        generated always as (sku ~ '^[0-9]{1,18}$') stored;
+
+alter table public.fact_stock_venta
+    add column if not exists sku_num bigint
+        generated always as (
+            case when sku ~ '^[0-9]{1,18}$' then sku::bigint end
+        ) stored;
+
+create index if not exists idx_fact_local_marca_sku_sort
+    on public.fact_stock_venta (cod_rt, marca, (not sku_is_num), sku_num, sku);
+
+-- Pendiente (fuera de este DDL): exponer sku_is_num / sku_num en
+-- public.v_stock_local_cliente_ux y reemplazar en app/db.py
+--   CASE WHEN "Sku" ~ '^[0-9]+$' THEN 0 ELSE 1 END, ("Sku")::bigint
+-- por (NOT sku_is_num), sku_num.
+
+commit;
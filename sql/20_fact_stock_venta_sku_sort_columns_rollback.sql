@@ -0,0 +1,12 @@
+-- NO APPLY
+-- REVIEW ROLLBACK ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Drops only the SKU sort columns and index added by 19_fact_stock_venta_sku_sort_columns.sql.
+
+begin;
+
+drop index if exists public.idx_fact_local_marca_sku_sort;
+alter table public.fact_stock_venta drop column if exists sku_num;
+alter table public.fact_stock_venta drop column if exists sku_is_num;
+
+commit;
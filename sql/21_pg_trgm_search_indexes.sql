@@ -0,0 +1,26 @@
+-- NO APPLY
+-- REVIEW DDL ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Busqueda reposicion / scope cliente: ILIKE '%texto%' sobre SKU, descripcion y marca.
+-- Un B-tree no sirve para comodin inicial; GIN trigram si.
+
+begin;
+
+create extension if not exists pg_trgm;
+
+create index if not exists idx_fact_sku_trgm
+    on public.fact_stock_venta using gin (sku gin_trgm_ops);
+
+create index if not exists idx_fact_descripcion_trgm
+    on public.fact_stock_venta using gin (descripcion_producto gin_trgm_ops);
+
+create index if not exists idx_fact_marca_trgm
+    on public.fact_stock_venta using gin (marca gin_trgm_ops);
+
+create index if not exists idx_mv_cliente_scope_inv_sku_trgm
+    on public.mv_cliente_scope_inventory_enriched using gin (sku gin_trgm_ops);
+
+create index if not exists idx_mv_cliente_scope_inv_producto_trgm
+    on public.mv_cliente_scope_inventory_enriched using gin (producto gin_trgm_ops);
+
+commit;
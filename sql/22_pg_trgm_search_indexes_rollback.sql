@@ -0,0 +1,15 @@
+-- NO APPLY
+-- REVIEW ROLLBACK ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Drops only the trigram indexes added by 21_pg_trgm_search_indexes.sql.
+-- The pg_trgm extension is left installed; other objects may depend on it.
+
+begin;
+
+drop index if exists public.idx_mv_cliente_scope_inv_producto_trgm;
+drop index if exists public.idx_mv_cliente_scope_inv_sku_trgm;
+drop index if exists public.idx_fact_marca_trgm;
+drop index if exists public.idx_fact_descripcion_trgm;
+drop index if exists public.idx_fact_sku_trgm;
+
+commit;
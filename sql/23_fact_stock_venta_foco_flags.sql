@@ -0,0 +1,32 @@
+-- NO APPLY
+-- REVIEW DDL ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Focos reposicion (Negativo / Quiebres): hoy cada pagina, KPI y filtro evalua
+-- UPPER(TRIM(COALESCE("NEGATIVO", ''))) = 'SI' por fila sobre la vista puente.
+-- Precomputa los flags una vez por fila en la tabla base y los indexa por local.
+
+begin;
+
+-- Misma regla que v_local_skus_ux (02_views): stock = inv_u, venta_7 = venta_u.
+alter table public.fact_stock_venta
+    add column if not exists is_negativo boolean
+        generated always as (coalesce(inv_u, 0) < 0) stored;
+
+alter table public.fact_stock_venta
+    add column if not exists is_riesgo_quiebre boolean
+        generated always as (
+            coalesce(venta_u, 0) > 0
+            and coalesce(inv_u, 0) > 0
+            and inv_u < venta_u
+        ) stored;
+
+create index if not exists idx_fact_local_foco_flags
+    on public.fact_stock_venta (cod_rt, is_negativo, is_riesgo_quiebre)
+    include (marca, sku);
+
+-- Pendiente (fuera de este DDL): confirmar la regla contra la definicion viva de
+-- public.v_stock_local_cliente_ux, exponer is_negativo / is_riesgo_quiebre y
+-- reemplazar en app/db.py (_build_result_filters, _kpi_columns_sql) las
+-- comparaciones UPPER(TRIM(COALESCE(...))) = 'SI' por los flags.
+
+commit;
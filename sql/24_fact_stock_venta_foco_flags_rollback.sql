@@ -0,0 +1,12 @@
+-- NO APPLY
+-- REVIEW ROLLBACK ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Drops only the foco flag columns and index added by 23_fact_stock_venta_foco_flags.sql.
+
+begin;
+
+drop index if exists public.idx_fact_local_foco_flags;
+alter table public.fact_stock_venta drop column if exists is_riesgo_quiebre;
+alter table public.fact_stock_venta drop column if exists is_negativo;
+
+commit;
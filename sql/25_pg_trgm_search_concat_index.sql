@@ -0,0 +1,20 @@
+-- NO APPLY
+-- REVIEW DDL ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Busqueda reposicion: app/db.py (_build_result_filters) filtra con un solo
+-- LOWER(sku || ' ' || COALESCE(descripcion, '') || ' ' || marca) LIKE LOWER('%texto%').
+-- Un GIN trigram sobre esa misma expresion resuelve la busqueda con un index scan
+-- en vez del BitmapOr sobre los tres indices por columna de 21_pg_trgm_search_indexes.sql.
+-- CONCURRENTLY no corre dentro de begin/commit: ejecutar sentencia por sentencia.
+
+create extension if not exists pg_trgm;
+
+create index concurrently if not exists idx_fact_search_trgm
+    on public.fact_stock_venta using gin (
+        (lower(sku || ' ' || coalesce(descripcion_producto, '') || ' ' || marca)) gin_trgm_ops
+    );
+
+-- Pendiente (fuera de este DDL): confirmar con EXPLAIN que el predicado sobre
+-- public.v_stock_local_cliente_ux se inlinea a esta expresion; si es asi,
+-- idx_fact_sku_trgm / idx_fact_descripcion_trgm / idx_fact_marca_trgm (21) quedan
+-- sin uso en reposicion y se pueden revisar para drop.
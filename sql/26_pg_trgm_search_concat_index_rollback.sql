@@ -0,0 +1,7 @@
+-- NO APPLY
+-- REVIEW ROLLBACK ONLY
+-- Requires separate Bastian authorization before any SQL execution.
+-- Drops only the trigram index added by 25_pg_trgm_search_concat_index.sql.
+-- The pg_trgm extension is left installed; other objects may depend on it.
+
+drop index concurrently if exists public.idx_fact_search_trgm;
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import __future__
+import io
+import re
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import xlsxwriter
+
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def load_app_functions(relative_path: str, *names: str, **extra: Any) -> SimpleNamespace:
+    # app/db.py and app/exports.py import streamlit/sqlalchemy/reportlab at module level, which the
+    # CI_CORE environment does not install; compile only the top-level source of the pure helpers.
+    path = ROOT / relative_path
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    chunks = []
+    for name in names:
+        starts = [i for i, line in enumerate(lines) if line.startswith(f"def {name}(")]
+        if len(starts) != 1:
+            raise AssertionError(f"{relative_path} must define {name} exactly once")
+        end = starts[0] + 1
+        while end < len(lines) and (not lines[end].strip() or lines[end][0] in " \t)"):
+            end += 1
+        chunks.append("".join(lines[starts[0]:end]))
+    namespace: dict[str, Any] = {"Any": Any, "np": np, "pd": pd, "re": re, **extra}
+    code = compile(
+        "\n".join(chunks),
+        str(path),
+        "exec",
+        flags=__future__.annotations.compiler_flag,
+        dont_inherit=True,
+    )
+    exec(code, namespace)
+    return SimpleNamespace(**{name: namespace[name] for name in names})
+
+
+def sql_sort_key(marca: str, sku: str, desc: str | None) -> tuple:
+    # Python mirror of _tabla_ux_sort_key_sql for ASCII data.
+    is_num = re.fullmatch(r"[0-9]{1,18}", sku) is not None
+    return (marca, 0 if is_num else 1, int(sku) if is_num else 0, sku, desc or "")
+
+
+class TablaUxKeysetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.db = load_app_functions(
+            "app/db.py",
+            "_tabla_ux_sort_key_sql",
+            "_tabla_ux_keyset",
+            "tabla_ux_cursor",
+        )
+
+    @staticmethod
+    def after_tuple(params: dict) -> tuple:
+        return (
+            params["after_marca"],
+            params["after_sku_txt"],
+            params["after_sku_num"],
+            params["after_sku"],
+            params["after_desc"],
+        )
+
+    def test_first_page_has_no_keyset_predicate(self) -> None:
+        self.assertEqual(self.db._tabla_ux_keyset(None), ("", {}))
+        self.assertEqual(self.db._tabla_ux_keyset(()), ("", {}))
+
+    def test_keyset_compares_the_order_by_tuple(self) -> None:
+        clause, params = self.db._tabla_ux_keyset(("M", "0042", "desc"), alias="v")
+        self.assertEqual(
+            clause,
+            f"AND ({self.db._tabla_ux_sort_key_sql('v')}) > "
+            "(:after_marca, :after_sku_txt, :after_sku_num, :after_sku, :after_desc)",
+        )
+        self.assertEqual(self.after_tuple(params), ("M", 0, 42, "0042", "desc"))
+
+    def test_sort_key_sql_uses_the_18_digit_numeric_contract(self) -> None:
+        sql = self.db._tabla_ux_sort_key_sql("v")
+        self.assertEqual(sql.count("'^[0-9]{1,18}$'"), 2)
+        self.assertIn('COALESCE(v."Descripción del Producto", \'\')', sql)
+
+    def test_text_and_oversized_skus_are_not_cast(self) -> None:
+        for sku in ("12A", "", "1234567890123456789", " 12"):
+            with self.subTest(sku=sku):
+                _, params = self.db._tabla_ux_keyset(("M", sku, "d"))
+                self.assertEqual(self.after_tuple(params), ("M", 1, 0, sku, "d"))
+
+    def test_missing_description_matches_coalesce(self) -> None:
+        for desc in (None, float("nan"), pd.NA):
+            with self.subTest(desc=desc):
+                _, params = self.db._tabla_ux_keyset(("M", "7", desc))
+                self.assertEqual(params["after_desc"], "")
+
+    def test_cursor_uses_last_row_and_handles_empty_pages(self) -> None:
+        self.assertIsNone(self.db.tabla_ux_cursor(None))
+        self.assertIsNone(self.db.tabla_ux_cursor(pd.DataFrame(columns=["MARCA", "Sku"])))
+        df = pd.DataFrame({"MARCA": ["A", "B"], "Sku": ["1", "2"], "Descripción del Producto": ["x", "y"]})
+        self.assertEqual(self.db.tabla_ux_cursor(df), ("B", "2", "y"))
+        self.assertEqual(self.db.tabla_ux_cursor(df.drop(columns=["Descripción del Producto"])), ("B", "2", None))
+
+    def test_pages_cover_every_row_once_without_ties_or_skips(self) -> None:
+        rows = [
+            ("A", "10", "x"),
+            ("A", "9", "x"),
+            ("A", "007", "x"),
+            ("A", "7", "x"),
+            ("A", "7", None),
+            ("A", "7", "y"),
+            ("A", "ABC", "x"),
+            ("A", "1234567890123456789", "x"),
+            ("A", "", "x"),
+            ("B", "1", "x"),
+            ("B", "1", "z"),
+            ("B", "X1", None),
+            ("C", "000000000000000001", "x"),
+        ]
+        ordered = sorted(rows, key=lambda r: sql_sort_key(*r))
+        for page_size in (1, 2, 3, 5, len(rows)):
+            with self.subTest(page_size=page_size):
+                seen: list[tuple] = []
+                after = None
+                for _ in range(len(rows) + 1):
+                    _, params = self.db._tabla_ux_keyset(after)
+                    bound = self.after_tuple(params) if params else None
+                    page = [r for r in ordered if bound is None or sql_sort_key(*r) > bound][:page_size]
+                    if not page:
+                        break
+                    seen.extend(page)
+                    df = pd.DataFrame(page, columns=["MARCA", "Sku", "Descripción del Producto"])
+                    after = self.db.tabla_ux_cursor(df)
+                self.assertEqual(seen, ordered)
+
+
+class ExportSkuSortKeysTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.exports = load_app_functions("app/exports.py", "_sku_sort_keys")
+
+    def test_keys_match_the_sql_sort_contract(self) -> None:
+        skus = [
+            "10", "9", "007", "7", "", "ABC", "12A", "1.5", "-3", " 12",
+            "123456789012345678", "1234567890123456789", "١٢", "²",
+        ]
+        is_text, sku_num = self.exports._sku_sort_keys(pd.Series(skus, dtype=object))
+        self.assertEqual(is_text.dtype, np.int8)
+        self.assertEqual(sku_num.dtype, np.int64)
+        self.assertEqual(
+            list(zip(is_text.tolist(), sku_num.tolist())),
+            [sql_sort_key("", sku, None)[1:3] for sku in skus],
+        )
+
+    def test_sorting_by_keys_matches_screen_order(self) -> None:
+        df = pd.DataFrame({"Sku": ["B2", "10", "2", "0010", "A1", "1"]})
+        df["_sku_is_text"], df["_sku_num"] = self.exports._sku_sort_keys(df["Sku"])
+        ordered = df.sort_values(["_sku_is_text", "_sku_num", "Sku"], kind="mergesort")["Sku"].tolist()
+        self.assertEqual(ordered, sorted(df["Sku"], key=lambda sku: sql_sort_key("", sku, None)))
+        self.assertEqual(ordered, ["1", "2", "0010", "10", "A1", "B2"])
+
+    def test_empty_series(self) -> None:
+        is_text, sku_num = self.exports._sku_sort_keys(pd.Series([], dtype=object))
+        self.assertEqual((is_text.size, sku_num.size), (0, 0))
+
+
+class CanonParamsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.db = load_app_functions("app/db.py", "_canon_params")
+
+    def test_empty_params_collapse_to_none(self) -> None:
+        self.assertIsNone(self.db._canon_params(None))
+        self.assertIsNone(self.db._canon_params({}))
+
+    def test_key_order_is_canonical(self) -> None:
+        a = self.db._canon_params({"b": 2, "a": 1, "c": [3]})
+        b = self.db._canon_params({"c": [3], "a": 1, "b": 2})
+        self.assertEqual(list(a), ["a", "b", "c"])
+        self.assertEqual(list(a.items()), list(b.items()))
+
+    def test_values_are_kept_and_input_is_not_mutated(self) -> None:
+        marcas = ["X", "Y"]
+        params = {"marcas": marcas, "cod_rt": "RT1", "limit": 0, "search": None}
+        canon = self.db._canon_params(params)
+        self.assertEqual(canon, params)
+        self.assertIs(canon["marcas"], marcas)
+        self.assertEqual(list(params), ["marcas", "cod_rt", "limit", "search"])
+
+
+class BuildResultFiltersTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.db = load_app_functions("app/db.py", "_build_result_filters")
+
+    def test_no_marcas_means_no_brand_filter(self) -> None:
+        for marcas in (None, []):
+            sql, params = self.db._build_result_filters(marcas, "", None)
+            self.assertNotIn("MARCA", sql)
+            self.assertEqual(params, {})
+
+    def test_selection_order_and_duplicates_share_sql_and_params(self) -> None:
+        a = self.db._build_result_filters(["Y", "X", "Y"], "", None, alias="v")
+        b = self.db._build_result_filters(["X", "Y"], "", None, alias="v")
+        self.assertEqual(a, b)
+        self.assertIn('v."MARCA" = ANY(:marcas)', a[0])
+        self.assertEqual(a[1], {"marcas": ["X", "Y"]})
+
+    def test_single_marca_uses_equality(self) -> None:
+        sql, params = self.db._build_result_filters(["X", "X"], "", None, alias="v")
+        self.assertIn('v."MARCA" = :marca', sql)
+        self.assertEqual(params, {"marca": "X"})
+
+    def test_blank_marcas_still_filter_instead_of_matching_everything(self) -> None:
+        sql, params = self.db._build_result_filters(["", " "], "", None)
+        self.assertIn('"MARCA" = ANY(:marcas)', sql)
+        self.assertEqual(params, {"marcas": ["", " "]})
+        sql, params = self.db._build_result_filters([" X "], "", None)
+        self.assertEqual(params, {"marca": " X "})
+
+
+class XlsxCellValueTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.exports = load_app_functions("app/exports.py", "_xlsx_cell_value")
+
+    def test_missing_values_become_empty_cells(self) -> None:
+        for value in (None, "", float("nan"), np.nan, pd.NaT, pd.NA):
+            with self.subTest(value=value):
+                self.assertIsNone(self.exports._xlsx_cell_value(value))
+
+    def test_nullable_extension_columns(self) -> None:
+        values = pd.Series([1, None], dtype="Int64").tolist() + pd.Series([True, None], dtype="boolean").tolist()
+        self.assertEqual([self.exports._xlsx_cell_value(v) for v in values], [1, None, True, None])
+
+    def test_numpy_and_timestamp_scalars_are_unwrapped(self) -> None:
+        value = self.exports._xlsx_cell_value(np.int64(3))
+        self.assertEqual((value, type(value)), (3, int))
+        self.assertEqual(
+            self.exports._xlsx_cell_value(pd.Timestamp("2026-01-05 10:00")),
+            pd.Timestamp("2026-01-05 10:00").to_pydatetime(),
+        )
+
+    def test_non_scalars_pass_through(self) -> None:
+        self.assertEqual(self.exports._xlsx_cell_value(["a", None]), ["a", None])
+
+
+class ConcatChunksByColumnTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.db = load_app_functions("app/db.py", "_concat_chunks_by_column")
+
+    def test_matches_pd_concat(self) -> None:
+        chunks = [
+            pd.DataFrame({
+                "fecha": pd.to_datetime(["2026-01-05"] * 3),
+                "Sku": [f"{start + i}" for i in range(3)],
+                "Stock": np.arange(start, start + 3, dtype=np.int64),
+                "venta": [1.5, None, 2.0],
+            })
+            for start in (0, 3, 6)
+        ]
+        expected = pd.concat(chunks, ignore_index=True)
+        pd.testing.assert_frame_equal(self.db._concat_chunks_by_column(iter(chunks)), expected)
+
+    def test_keeps_repeated_column_names(self) -> None:
+        chunks = [pd.DataFrame([[1, "a"], [2, "b"]], columns=["x", "x"]), pd.DataFrame([[3, "c"]], columns=["x", "x"])]
+        pd.testing.assert_frame_equal(
+            self.db._concat_chunks_by_column(chunks),
+            pd.concat(chunks, ignore_index=True),
+        )
+
+    def test_single_and_missing_chunks(self) -> None:
+        only = pd.DataFrame({"a": [1, 2]}, index=[5, 6])
+        pd.testing.assert_frame_equal(self.db._concat_chunks_by_column([only]), only.reset_index(drop=True))
+        self.assertIsNone(self.db._concat_chunks_by_column(iter(())))
+
+
+class XlsxStreamingRoundTripTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.exports = load_app_functions(
+            "app/exports.py",
+            "_xlsx_cell_value",
+            "_write_xlsx_streaming",
+            io=io,
+            date=date,
+            datetime=datetime,
+            xlsxwriter=xlsxwriter,
+        )
+
+    def test_streamed_workbook_reads_back_headers_values_and_types(self) -> None:
+        df = pd.DataFrame({
+            "Sku": ["007", "A-1", ""],
+            "Stock": pd.array([3, None, -2], dtype="Int64"),
+            "Venta": [1.5, np.nan, 0.0],
+            "Flag": pd.array([True, None, False], dtype="boolean"),
+            "Fecha": [pd.Timestamp("2026-01-05 10:30"), pd.NaT, pd.Timestamp("2026-01-06")],
+            "Dia": [date(2026, 1, 5), None, date(2026, 1, 7)],
+            "Texto": ["=SUM(A1)", "http://x", "1e3"],
+        })
+        out = io.BytesIO()
+        self.exports._write_xlsx_streaming(out, "DATA", df)
+
+        ws = openpyxl.load_workbook(io.BytesIO(out.getvalue())).active
+        self.assertEqual(ws.title, "DATA")
+        self.assertEqual(ws.freeze_panes, "A2")
+        self.assertEqual(ws.auto_filter.ref, "A1:G4")
+        rows = list(ws.values)
+        self.assertEqual(rows[0], tuple(df.columns))
+        self.assertEqual(rows[1], ("007", 3, 1.5, True, datetime(2026, 1, 5, 10, 30), datetime(2026, 1, 5), "=SUM(A1)"))
+        self.assertEqual(rows[2], ("A-1", None, None, None, None, None, "http://x"))
+        self.assertEqual(rows[3], (None, -2, 0, False, datetime(2026, 1, 6), datetime(2026, 1, 7), "1e3"))
+        self.assertIsInstance(rows[1][1], int)
+        self.assertIsInstance(rows[1][2], float)
+        self.assertEqual(ws["E2"].number_format, "yyyy-mm-dd hh:mm:ss")
+        self.assertEqual(ws["F2"].number_format, "yyyy-mm-dd")
+        self.assertEqual(ws["G2"].data_type, "s")
+
+
+if __name__ == "__main__":
+    unittest.main()
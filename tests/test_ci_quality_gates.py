@@ -82,8 +82,8 @@ class CIQualityGateTests(unittest.TestCase):
         self.assertEqual(sum(map(len, groups.values())), len(list((ROOT / "tests").glob("test_*.py"))))
         self.assertIn("tests/test_ci_quality_gates.py", groups["CI_CORE"])
         self.assertEqual({category: len(modules) for category, modules in groups.items()}, {
-            "CI_CORE": 27,
-            "CI_POSTGRESQL": 2,
+            "CI_CORE": 29,
+            "CI_POSTGRESQL": 3,
             "LOCAL_SOURCE_INTEGRATION": 2,
             "LOCAL_ENVIRONMENT": 2,
             "PRODUCTIVE_NEVER_CI": 0,
@@ -0,0 +1,132 @@
+import unittest
+
+from scripts.load_fact_from_excel import (
+    FACT_LOAD_COLUMNS,
+    STAGING_TABLE,
+    _copy_text_value,
+    copy_rows_batch,
+    insert_rows_batch,
+)
+
+
+SQL_INSERT = (
+    f"INSERT INTO public.fact_stock_venta ({', '.join(FACT_LOAD_COLUMNS)}) VALUES %s "
+    "ON CONFLICT (fecha, cod_rt, sku, marca) DO UPDATE SET inv_u = EXCLUDED.inv_u"
+)
+
+
+COLS = ", ".join(FACT_LOAD_COLUMNS)
+ROW = ("2026-01-05", "C", "M", "001", "desc\tx", "1", 2, None, "RT1", "", float("nan"), "src")
+ROW_TEXT = "2026-01-05\tC\tM\t001\tdesc\\tx\t1\t2\t\\N\tRT1\t\t\\N\tsrc\n"
+
+
+class Psycopg2Cursor:
+    # Ruta de producción: cursor psycopg2 con copy_expert(sql, file).
+    def __init__(self) -> None:
+        self.executed: list[str] = []
+        self.copied: list[tuple[str, str]] = []
+
+    def execute(self, sql: str) -> None:
+        self.executed.append(sql)
+
+    def copy_expert(self, sql: str, file) -> None:
+        self.executed.append(sql)
+        self.copied.append((sql, file.read()))
+
+
+class RecordingCopy:
+    def __init__(self, sink: list[str]) -> None:
+        self.sink = sink
+
+    def __enter__(self) -> "RecordingCopy":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def write(self, data: str) -> None:
+        self.sink.append(data)
+
+
+class Psycopg3Cursor:
+    # Harness CI_POSTGRESQL: cursor psycopg 3 con copy(sql) como context manager.
+    def __init__(self) -> None:
+        self.executed: list[str] = []
+        self.copied: list[str] = []
+
+    def execute(self, sql: str) -> None:
+        self.executed.append(sql)
+
+    def copy(self, sql: str) -> RecordingCopy:
+        self.executed.append(sql)
+        return RecordingCopy(self.copied)
+
+
+class CopyTextValueTests(unittest.TestCase):
+    def test_escapes_backslash_tab_and_newlines(self) -> None:
+        self.assertEqual(_copy_text_value("a\\b"), "a\\\\b")
+        self.assertEqual(_copy_text_value("a\tb"), "a\\tb")
+        self.assertEqual(_copy_text_value("a\nb"), "a\\nb")
+        self.assertEqual(_copy_text_value("a\r\nb"), "a\\r\\nb")
+        self.assertEqual(_copy_text_value("\\n"), "\\\\n")
+
+    def test_none_and_nan_become_null_marker(self) -> None:
+        self.assertEqual(_copy_text_value(None), r"\N")
+        self.assertEqual(_copy_text_value(float("nan")), r"\N")
+
+    def test_empty_string_stays_empty(self) -> None:
+        self.assertEqual(_copy_text_value(""), "")
+
+    def test_literal_null_marker_text_is_escaped(self) -> None:
+        self.assertEqual(_copy_text_value(r"\N"), r"\\N")
+
+    def test_scalars_use_str(self) -> None:
+        self.assertEqual(_copy_text_value(12), "12")
+        self.assertEqual(_copy_text_value(1.5), "1.5")
+
+
+class CopyRowsBatchTests(unittest.TestCase):
+    def expected_statements(self) -> list[str]:
+        return [
+            f"create temp table if not exists {STAGING_TABLE} on commit drop as "
+            f"select {COLS} from public.fact_stock_venta with no data",
+            f"truncate {STAGING_TABLE}",
+            f"copy {STAGING_TABLE} ({COLS}) from stdin",
+            SQL_INSERT.replace("VALUES %s", f"SELECT {COLS} FROM {STAGING_TABLE}"),
+        ]
+
+    def test_rejects_sql_without_values_placeholder(self) -> None:
+        cur = Psycopg2Cursor()
+        with self.assertRaisesRegex(ValueError, "VALUES %s"):
+            copy_rows_batch(cur=cur, sql_insert="INSERT INTO t SELECT 1", rows=[])
+        self.assertEqual(cur.executed, [])
+
+    def test_psycopg2_stages_with_copy_expert_and_merges(self) -> None:
+        cur = Psycopg2Cursor()
+        copy_rows_batch(cur=cur, sql_insert=SQL_INSERT, rows=[ROW, ROW])
+
+        self.assertEqual(cur.executed, self.expected_statements())
+        self.assertEqual(cur.copied, [(f"copy {STAGING_TABLE} ({COLS}) from stdin", ROW_TEXT * 2)])
+        self.assertIn("ON CONFLICT (fecha, cod_rt, sku, marca)", cur.executed[-1])
+        self.assertNotIn("VALUES %s", cur.executed[-1])
+
+    def test_psycopg2_empty_batch_still_merges_an_empty_staging(self) -> None:
+        cur = Psycopg2Cursor()
+        copy_rows_batch(cur=cur, sql_insert=SQL_INSERT, rows=[])
+        self.assertEqual(cur.executed, self.expected_statements())
+        self.assertEqual(cur.copied[0][1], "")
+
+    def test_psycopg3_cursor_writes_the_same_payload(self) -> None:
+        cur = Psycopg3Cursor()
+        copy_rows_batch(cur=cur, sql_insert=SQL_INSERT, rows=[ROW])
+        self.assertEqual(cur.executed, self.expected_statements())
+        self.assertEqual(cur.copied, [ROW_TEXT])
+
+    def test_insert_rows_batch_dispatches_copy(self) -> None:
+        cur = Psycopg2Cursor()
+        insert_rows_batch(cur=cur, sql_insert=SQL_INSERT, rows=[ROW], page_size=10, method="copy")
+        self.assertEqual(cur.copied[0][1], ROW_TEXT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import unittest
+from datetime import date
+from decimal import Decimal
+
+import psycopg
+
+from scripts.load_fact_from_excel import FACT_LOAD_COLUMNS, copy_rows_batch
+
+
+DSN = os.environ.get("DB_URL_CODEX_LOCAL")
+
+# Solo si la base aislada no trae la tabla; todo corre en una transacción con rollback.
+FACT_DDL = """
+CREATE TABLE IF NOT EXISTS public.fact_stock_venta (
+    fecha date NOT NULL,
+    cadena text,
+    marca text NOT NULL,
+    sku text NOT NULL,
+    descripcion_producto text,
+    n_local text,
+    venta_u numeric,
+    inv_u numeric,
+    cod_rt text NOT NULL,
+    nombre_local_rr text,
+    otros text,
+    source text,
+    UNIQUE (fecha, cod_rt, sku, marca)
+)
+"""
+
+SQL_INSERT = f"""
+INSERT INTO public.fact_stock_venta ({", ".join(FACT_LOAD_COLUMNS)})
+VALUES %s
+ON CONFLICT (fecha, cod_rt, sku, marca)
+DO UPDATE SET
+  descripcion_producto = EXCLUDED.descripcion_producto,
+  venta_u = EXCLUDED.venta_u,
+  inv_u = EXCLUDED.inv_u,
+  otros = EXCLUDED.otros,
+  source = EXCLUDED.source
+"""
+
+MARCA = "ZZ_COPY_ROUNDTRIP"
+
+
+def fact_row(sku: str, descripcion, venta_u, inv_u, otros) -> tuple:
+    return (
+        date(2026, 1, 5), "CADENA", MARCA, sku, descripcion, "7",
+        venta_u, inv_u, "RT-COPY", "LOCAL", otros, "copy-roundtrip",
+    )
+
+
+@unittest.skipUnless(DSN, "DB_URL_CODEX_LOCAL is required for the local PostgreSQL rehearsal")
+class LoadFactCopyPostgresRoundTrip(unittest.TestCase):
+    def fetch(self, cursor) -> list[tuple]:
+        cursor.execute(
+            "SELECT sku, descripcion_producto, venta_u, inv_u, otros "
+            "FROM public.fact_stock_venta WHERE marca = %s ORDER BY sku",
+            (MARCA,),
+        )
+        return cursor.fetchall()
+
+    def test_copy_rows_batch_round_trips_escapes_nulls_and_upserts(self) -> None:
+        rows = [
+            fact_row("001", "barra \\ invertida", 1, 2, ""),
+            fact_row("002", "tab\taqui", 0, None, float("nan")),
+            fact_row("003", "linea\nnueva\r", 3.5, 4, r"\N"),
+        ]
+        with psycopg.connect(DSN) as connection:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(FACT_DDL)
+                    copy_rows_batch(cur=cursor, sql_insert=SQL_INSERT, rows=rows)
+                    self.assertEqual(self.fetch(cursor), [
+                        ("001", "barra \\ invertida", Decimal("1"), Decimal("2"), ""),
+                        ("002", "tab\taqui", Decimal("0"), None, None),
+                        ("003", "linea\nnueva\r", Decimal("3.5"), Decimal("4"), r"\N"),
+                    ])
+
+                    # Segundo batch en la misma transacción: staging se trunca y el merge actualiza.
+                    copy_rows_batch(
+                        cur=cursor,
+                        sql_insert=SQL_INSERT,
+                        rows=[fact_row("002", "tab\taqui", 0, 9, "ok")],
+                    )
+                    self.assertEqual(self.fetch(cursor)[1], ("002", "tab\taqui", Decimal("0"), Decimal("9"), "ok"))
+                    cursor.execute("SELECT count(*) FROM public.fact_stock_venta WHERE marca = %s", (MARCA,))
+                    self.assertEqual(cursor.fetchone()[0], 3)
+            finally:
+                connection.rollback()
+
+
+if __name__ == "__main__":
+    unittest.main()